@@ -6,11 +6,39 @@ Jan 17, 2023
 this file will contain the classes Appt and Agenda
 '''
 
-from datetime import datetime
+import gc
+import heapq
+from array import array
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, Sequence, Union
+from appt_index import IntervalIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None   # Agenda.conflicts_bulk falls back to Agenda.conflicts
+
+# Compact representations of an Appt (e.g., appt_columnar) record
+# times as whole minutes since EPOCH.
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+# The smallest difference between two datetimes
+_TICK = timedelta(microseconds=1)
+
+
+def to_minutes(t: datetime) -> int:
+    """Minutes from EPOCH to t, ignoring seconds (like the text format)"""
+    return (t.toordinal() - _EPOCH_ORDINAL) * 1440 + t.hour * 60 + t.minute
+
+
+def from_minutes(minutes: int) -> datetime:
+    """Inverse of to_minutes"""
+    return EPOCH + timedelta(minutes=minutes)
+
 
 class Appt:
     """An appointment has a start time, an end time, and a title.
-    The start and end time should be on the same day.
+    The end time may be on a later day than the start time.
     Usage example:
         appt1 = Appt(datetime(2018, 3, 15, 13, 30), datetime(2018, 3, 15, 15, 30), "Early afternoon nap")
         appt2 = Appt(datetime(2018, 3, 15, 15, 00), datetime(2018, 3, 15, 16, 00), "Coffee break")
@@ -25,7 +53,7 @@ class Appt:
     """
     def __init__(self, start: datetime, finish: datetime, desc: str):
         """An appointment from start timet to finish timem, with description desc.
-        Start and finish should be the same day"""
+        Finish may be on a later day than start"""
         assert finish > start, f"Period finish ({finish}) must be after start ({start})"
         self.start = start
         self.finish = finish
@@ -63,20 +91,126 @@ class Appt:
     def __str__(self) -> str:
         """The textual format of an appointment is
         yyyy-mm-dd hh:mm hh:mm  | description
-        Note that this is accurate only if start and finish
-        are on the same day.
+        or, if it finishes on a later day than it starts,
+        yyyy-mm-dd hh:mm yyyy-mm-dd hh:mm  | description
         """
         date_iso = self.start.date().isoformat()
         start_iso = self.start.time().isoformat(timespec='minutes')
         finish_iso = self.finish.time().isoformat(timespec='minutes')
-        return f"{date_iso} {start_iso} {finish_iso} | {self.desc}" 
+        if self.finish.date() != self.start.date():
+            finish_iso = f"{self.finish.date().isoformat()} {finish_iso}"
+        return f"{date_iso} {start_iso} {finish_iso} | {self.desc}"
 
     def __repr__(self) -> str:
         return f"Appt({repr(self.start)}, {repr(self.finish)}, {repr(self.desc)})"
 
+    def freeze(self) -> 'FrozenAppt':
+        """An immutable, hashable copy of this appointment"""
+        return FrozenAppt(self.start, self.finish, self.desc)
+
+
+class FrozenAppt:
+    """An appointment that cannot be changed, so it can be put in a set
+    or used as a dict key.  Unlike Appt, two FrozenAppt are equal only
+    if their descriptions are equal too.  Times are kept as given, and
+    also as whole minutes since EPOCH, which settle most comparisons
+    without touching the datetimes; the full times decide when the
+    minutes are equal.  The hash is computed once, when created.
+    """
+    __slots__ = ("start", "finish", "desc", "start_minutes", "finish_minutes", "_hash")
+
+    def __init__(self, start: datetime, finish: datetime, desc: str):
+        assert finish > start, f"Period finish ({finish}) must be after start ({start})"
+        init = object.__setattr__
+        init(self, "start", start)
+        init(self, "finish", finish)
+        init(self, "desc", desc)
+        init(self, "start_minutes", to_minutes(start))
+        init(self, "finish_minutes", to_minutes(finish))
+        init(self, "_hash", hash((start, finish, desc)))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"FrozenAppt is immutable (cannot set {name})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"FrozenAppt is immutable (cannot delete {name})")
+
+    def __reduce__(self):
+        """Pickle by way of the constructor, since attributes cannot be set"""
+        return FrozenAppt, (self.start, self.finish, self.desc)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: 'FrozenAppt') -> bool:
+        """Same time period and same description"""
+        if not isinstance(other, FrozenAppt):
+            return NotImplemented
+        return (self._hash == other._hash
+                and self.start_minutes == other.start_minutes
+                and self.finish_minutes == other.finish_minutes
+                and self.start == other.start
+                and self.finish == other.finish
+                and self.desc == other.desc)
+
+    def __lt__(self, other: 'FrozenAppt') -> bool:
+        """Before, as for Appt"""
+        if self.finish_minutes != other.start_minutes:
+            return self.finish_minutes < other.start_minutes
+        return self.finish <= other.start
+
+    def __gt__(self, other: 'FrozenAppt') -> bool:
+        """After, as for Appt"""
+        return other < self
+
+    def overlaps(self, other: 'FrozenAppt') -> bool:
+        """Is there a non-zero overlap between these periods?"""
+        return not (self < other or other < self)
+
+    def intersect(self, other: 'FrozenAppt') -> 'FrozenAppt':
+        """The overlapping portion of two FrozenAppt objects"""
+        assert self.overlaps(other)
+        return FrozenAppt(max(self.start, other.start), min(self.finish, other.finish),
+                          f"{self.desc} and {other.desc}")
+
+    def thaw(self) -> Appt:
+        """An ordinary (mutable) Appt with the same period and description"""
+        return Appt(self.start, self.finish, self.desc)
+
+    __str__ = Appt.__str__
+
+    def __repr__(self) -> str:
+        return f"FrozenAppt({repr(self.start)}, {repr(self.finish)}, {repr(self.desc)})"
+
+def iter_conflicts(appts: Iterable[Appt]) -> Iterator[Appt]:
+    """The conflicts among appointments that arrive in order of
+    start time (e.g., appt_io.iter_appts on a sorted file), as each
+    is discovered.  Only the appointments still in progress are
+    remembered, so memory grows with the greatest number of
+    simultaneous appointments, not with the number of appointments.
+    Yields the same conflicts as Agenda.conflicts, ordered by the
+    later appointment of each pair rather than the earlier.
+    Raises ValueError if appts is not sorted by start time.
+    """
+    active = []
+    latest = None
+    for appoint in appts:
+        if latest is not None and appoint.start < latest:
+            raise ValueError(f"Appointments out of order at {appoint}")
+        latest = appoint.start
+        # Keep only those still in progress; each of them overlaps appoint
+        active = [earlier for earlier in active if earlier.finish > appoint.start]
+        for earlier in active:
+            yield earlier.intersect(appoint)
+        active.append(appoint)
+
+
 class Agenda:
     """An Agenda is a collection of appointments, 
     similar to a list. 
+    Change it through append and remove (or assign a whole new
+    list to elements); the queries do not notice the elements
+    list being changed in place.
 
     Usage:
     appt1 = Appt(datetime(2018, 3, 15, 13, 30), datetime(2018, 3, 15, 15, 30), "Early afternoon nap")
@@ -100,6 +234,25 @@ class Agenda:
     """
     def __init__(self):
         self.elements = []
+        # Same appointments as elements, sorted, for fast overlap queries,
+        # and the list they were taken from (see _indexed)
+        self._index = IntervalIndex()
+        self._index_source = self.elements
+        # Conflicts kept up to date by append and remove, once
+        # track_conflicts has been called.  Each appended appointment
+        # gets an _Entry with its own sequence number (so the same Appt
+        # appended twice is two entries), kept in an index of its own
+        # along with the elements list they were taken from.
+        # _tracked holds the intersection for each conflicting pair,
+        # keyed by the sequence numbers of the pair, and _partners the
+        # sequence numbers each entry conflicts with.
+        self._tracked = None
+        self._partners = None
+        self._entries = None
+        self._entries_source = None
+        self._next_seq = 0
+        # Recurring appointments (appt_recur.Recurrence), kept as rules
+        self.rules = []
     
     def __eq__(self, other: 'Agenda') -> bool:
         """Delegate to __eq__ (==) of wrapped lists"""
@@ -109,10 +262,44 @@ class Agenda:
         """Delegate to __len__ (len()) of wrapped lists"""
         return len(self.elements)
 
-    def append(self, other: 'Agenda'):
+    def __iter__(self) -> Iterator[Appt]:
+        """Delegate to __iter__ (for loops) of wrapped lists"""
+        return iter(self.elements)
+
+    def append(self, other: Appt):
         """Delegate to append (.append()) of wrapped lists"""
+        if self._tracked is not None:
+            self._track_append(other)
+        self._index.add(other)
         return self.elements.append(other)
 
+    def remove(self, appt: Appt):
+        """Delegate to remove (.remove()) of wrapped lists,
+        i.e., remove the first appointment == appt.
+        Raises ValueError if there is none.  Like list.remove,
+        this takes time linear in the length of the agenda.
+        """
+        self._remove_at(self.elements.index(appt))
+
+    def remove_exact(self, appt: Appt):
+        """Remove the first appointment with the same period
+        and the same description as appt (remove ignores the
+        description).  Raises ValueError if there is none.
+        """
+        for i, appoint in enumerate(self.elements):
+            if appoint == appt and appoint.desc == appt.desc:
+                self._remove_at(i)
+                return
+        raise ValueError(f"{appt} is not in the agenda")
+
+    def _remove_at(self, i: int):
+        """Remove elements[i], keeping the index and tracked conflicts up to date"""
+        removed = self.elements.pop(i)
+        if self._index_source is self.elements:
+            self._index.remove(removed)
+        if self._tracked is not None and self._entries_source is self.elements:
+            self._track_remove(removed)
+
     def __str__(self):
         """Each Appt on its own line"""
         lines = [ str(e) for e in self.elements ]
@@ -126,25 +313,443 @@ class Agenda:
         """Returns an agenda consisting of the conflicts
         (overlaps) between appointments in this agenda
         Side effect: this agenda is sorted
+        Rules run on without end, so their occurrences are not
+        included; for the conflicts in a window, rules and all,
+        use expand(window_start, window_end).conflicts().
         """
         self.sort()
+        # We have paid for a sort anyway, so index the sorted list
+        # afresh rather than trust an index that may be stale
+        self._reindex()
         agenda_conflicts = Agenda()
-        for base_appoint_i in range(len(self.elements)):
-            for test_appoint_i in range(base_appoint_i +1, len(self.elements)):
-                base_appoint = self.elements[base_appoint_i]
-                test_appoint = self.elements[test_appoint_i]
-                # if the start time is after the end period == no overlap so break
-                if base_appoint.finish < test_appoint.start:
-                    break
-                # test for overlap
-                if base_appoint.overlaps(test_appoint):
-                    agenda_conflicts.append(base_appoint.intersect(test_appoint))
+        for base_appoint, test_appoint in self._index.pairs():
+            agenda_conflicts.append(base_appoint.intersect(test_appoint))
         return agenda_conflicts
 
+    def deduplicate(self) -> int:
+        """Remove appointments that repeat an earlier one exactly
+        (same period and same description), keeping the first.
+        Returns the number removed.  Uses a set, so time is linear.
+        """
+        seen = set()
+        unique = []
+        for appoint in self.elements:
+            key = appoint.freeze()
+            if key not in seen:
+                seen.add(key)
+                unique.append(appoint)
+        removed = len(self.elements) - len(unique)
+        if removed:
+            self.elements = unique
+            self._reindex()
+            if self._tracked is not None:
+                self.track_conflicts()
+        return removed
+
+    def conflict_clusters(self) -> List['ConflictCluster']:
+        """The conflicts in this agenda as clusters:  maximal groups
+        of appointments joined by overlaps, each with the period it
+        covers and the most appointments in progress at once.  Found
+        in one pass over the appointments in start order, so a block
+        of n mutually overlapping appointments is one result, not
+        n*(n-1)/2 like conflicts().
+        """
+        clusters = []
+        members = []
+        finishes = []   # Heap of finish times of members in progress
+        peak = 0
+        cluster_finish = None
+        for appoint in self._indexed():
+            if members and appoint.start >= cluster_finish:
+                if len(members) > 1:
+                    clusters.append(ConflictCluster(members, cluster_finish, peak))
+                members, finishes, peak = [], [], 0
+            while finishes and finishes[0] <= appoint.start:
+                heapq.heappop(finishes)
+            heapq.heappush(finishes, appoint.finish)
+            peak = max(peak, len(finishes))
+            if not members or appoint.finish > cluster_finish:
+                cluster_finish = appoint.finish
+            members.append(appoint)
+        if len(members) > 1:
+            clusters.append(ConflictCluster(members, cluster_finish, peak))
+        return clusters
+
+    def concurrency_profile(self, bucket: timedelta) -> 'ConcurrencyProfile':
+        """The most appointments in progress at once during each
+        period of length bucket, from midnight on the day of the
+        first appointment to the last finish, and overall.  Found by
+        one sweep over start and finish times in order, in time
+        O(n log n) plus the number of buckets.
+        """
+        starts = list(self._indexed())
+        if not starts:
+            return ConcurrencyProfile(None, bucket, array('I'), 0)
+        finishes = sorted(appoint.finish for appoint in starts)
+        starts = [appoint.start for appoint in starts]
+        origin = datetime.combine(starts[0].date(), datetime.min.time(), starts[0].tzinfo)
+        counts = array('I', [0]) * -(-(finishes[-1] - origin) // bucket)
+        level = 0
+        peak = 0
+        since = origin   # Time of the last change in level
+        i = j = 0
+        while j < len(finishes):
+            # At equal times, finishes come first:  periods are half-open
+            if i < len(starts) and starts[i] < finishes[j]:
+                t, change = starts[i], 1
+                i += 1
+            else:
+                t, change = finishes[j], -1
+                j += 1
+            if t > since and level > 0:
+                # Level held from since until just before t
+                for b in range((since - origin) // bucket, (t - origin - _TICK) // bucket + 1):
+                    if counts[b] < level:
+                        counts[b] = level
+            level += change
+            peak = max(peak, level)
+            since = t
+        return ConcurrencyProfile(origin, bucket, counts, peak)
+
+    def conflicts_bulk(self) -> 'Agenda':
+        """Same result as conflicts(), for large batch jobs:
+        start and finish times are sorted and searched as NumPy
+        arrays of integers, so no Appt comparisons are made in Python,
+        and the result is built as one list rather than appended.
+        Falls back to conflicts() if NumPy is not installed.
+        Side effect: this agenda is sorted
+        """
+        if np is None:
+            return self.conflicts()
+        # Times as whole microseconds since EPOCH; datetime arithmetic
+        # is done in C, and int64 arrays are quick to build from lists
+        n = len(self.elements)
+        starts = np.array([(appoint.start - EPOCH) // _TICK for appoint in self.elements],
+                          dtype=np.int64)
+        order = np.argsort(starts, kind='stable')
+        elements = [self.elements[i] for i in order.tolist()]
+        self.elements = elements
+        self._reindex()
+        starts = starts[order]
+        finishes = np.array([(appoint.finish - EPOCH) // _TICK for appoint in elements],
+                            dtype=np.int64)
+        # Appointment i overlaps each later one that starts before i finishes
+        ends = np.searchsorted(starts, finishes, side='left')
+        counts = ends - np.arange(n) - 1
+        bases = np.repeat(np.arange(n), counts)
+        firsts = np.repeat(np.cumsum(counts) - counts, counts)
+        tests = bases + 1 + np.arange(len(bases)) - firsts
+        # The intersection ends at the earlier finish
+        enders = np.where(finishes[bases] <= finishes[tests], bases, tests)
+        agenda_conflicts = Agenda()
+        # The new Appts cannot form reference cycles, so the cyclic
+        # collector would only rescan them as they pile up
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            agenda_conflicts.elements = [
+                Appt(test_appoint.start, elements[ender].finish,
+                     f"{base_appoint.desc} and {test_appoint.desc}")
+                for base_appoint, test_appoint, ender in zip(
+                    map(elements.__getitem__, bases.tolist()),
+                    map(elements.__getitem__, tests.tolist()),
+                    enders.tolist())]
+        finally:
+            if collecting:
+                gc.enable()
+        return agenda_conflicts
+
+    def overlapping(self, period: Appt) -> 'Agenda':
+        """Returns an agenda of the appointments in this agenda
+        that overlap period, in order of start time, including
+        occurrences of rules (so a booking sees standing meetings).
+        Takes time proportional to log(len(self)) squared plus the
+        number found.
+        """
+        found = Agenda()
+        appts = self._indexed().overlapping(period.start, period.finish)
+        if self.rules:
+            streams = [appts]
+            streams.extend(rule.occurrences(period.start, period.finish) for rule in self.rules)
+            appts = heapq.merge(*streams, key=lambda appoint: appoint.start)
+        for appoint in appts:
+            found.append(appoint)
+        return found
+
+    def track_conflicts(self):
+        """From now on, keep the set of conflicts up to date
+        as appointments are appended and removed, so that
+        current_conflicts does not have to recompute it.
+        Each append then costs O(log^2 n + k) amortized for the
+        k conflicts it adds.  A remove costs as much for the
+        conflicts it drops, but finding the appointment in
+        elements is still linear, as for a list.
+        """
+        self._entries_source = self.elements
+        self._tracked = {}
+        self._partners = {}
+        self._entries = IntervalIndex(self._new_entry(appoint) for appoint in self.elements)
+        for base_entry, test_entry in self._entries.pairs():
+            self._track_pair(base_entry, test_entry)
+
+    def current_conflicts(self) -> 'Agenda':
+        """The conflicts in this agenda, as conflicts() would
+        report them but in no particular order, read from the
+        tracked set in time proportional to their number.
+        Starts tracking conflicts if we were not already.
+        Like conflicts(), it leaves out occurrences of rules.
+        """
+        if self._tracked is None or self._entries_source is not self.elements:
+            self.track_conflicts()
+        agenda_conflicts = Agenda()
+        for conflict in self._tracked.values():
+            agenda_conflicts.append(conflict)
+        return agenda_conflicts
+
+    def _new_entry(self, appoint: Appt) -> '_Entry':
+        """A tracking entry for appoint, with the next sequence number"""
+        self._next_seq += 1
+        return _Entry(appoint, self._next_seq)
+
+    def _track_pair(self, base_entry: '_Entry', test_entry: '_Entry'):
+        """Record the conflict between two entries, base_entry
+        being the earlier one in sorted order
+        """
+        key = (base_entry.seq, test_entry.seq)
+        self._tracked[key] = base_entry.appt.intersect(test_entry.appt)
+        self._partners.setdefault(key[0], set()).add(key[1])
+        self._partners.setdefault(key[1], set()).add(key[0])
+
+    def _track_append(self, new_appoint: Appt):
+        """Record the conflicts of an appointment about to be appended.
+        It sorts after existing appointments that start at the same time.
+        """
+        new_entry = self._new_entry(new_appoint)
+        for entry in self._entries.overlapping(new_appoint.start, new_appoint.finish):
+            if entry.start <= new_appoint.start:
+                self._track_pair(entry, new_entry)
+            else:
+                self._track_pair(new_entry, entry)
+        self._entries.add(new_entry)
+
+    def _track_remove(self, old_appoint: Appt):
+        """Forget the conflicts of an appointment that was removed.
+        If the same Appt was appended more than once, any one of its
+        entries will do, since they are alike.
+        """
+        for entry in self._entries.containing(old_appoint.start):
+            if entry.appt is old_appoint:
+                break
+        else:
+            # Not tracked; start over when next asked
+            self._tracked = None
+            return
+        self._entries.remove(entry)
+        old_seq = entry.seq
+        for partner_seq in self._partners.pop(old_seq, ()):
+            self._tracked.pop((old_seq, partner_seq), None)
+            self._tracked.pop((partner_seq, old_seq), None)
+            self._partners[partner_seq].discard(old_seq)
+
+    def between(self, start: datetime, finish: datetime) -> 'AgendaView':
+        """The appointments in this agenda that overlap the
+        period from start to finish, in order of start time.
+        Found by bisection, in time proportional to log(len(self))
+        plus the number found; the result is a view, not a copy,
+        and stays correct as appointments are appended or removed.
+        Occurrences of rules (see add_rule) in the period are included.
+        """
+        return AgendaView(self, start, finish)
+
+    def at(self, t: datetime) -> 'AgendaView':
+        """The appointments in progress at time t, in order of
+        start time, as a view like the one between returns
+        (so including occurrences of rules).
+        """
+        return AgendaView(self, t, None)
+
+    def free_slots(self, window_start: datetime, window_end: datetime,
+                   min_duration: timedelta = timedelta(0)) -> 'Agenda':
+        """The free periods of at least min_duration between window_start
+        and window_end, as an agenda of Appt described as 'free'.
+        Occurrences of rules are busy, like other appointments.
+        """
+        return common_free_slots([self], window_start, window_end, min_duration)
+
+    def add_rule(self, rule: 'appt_recur.Recurrence'):
+        """Add a recurring appointment.  Its occurrences are not
+        elements of the agenda, so len, iteration, conflicts and the
+        other whole-agenda operations do not see them; the window
+        queries (between, at, overlapping, free_slots, expand) make
+        the ones in their window and include them.
+        """
+        self.rules.append(rule)
+
+    def expand(self, window_start: datetime, window_end: datetime) -> 'Agenda':
+        """An agenda of the appointments overlapping the period from
+        window_start to window_end, including occurrences of rules,
+        in order of start time.
+        """
+        expanded = Agenda()
+        for appoint in self.between(window_start, window_end):
+            expanded.append(appoint)
+        return expanded
+
+    def _indexed(self) -> IntervalIndex:
+        """The interval index, rebuilt if a new list was assigned to
+        elements.  Changing the list in place behind our back (as in
+        elements.append(x) or elements[i] = x) is not supported and
+        is not noticed by the queries; use append and remove.
+        conflicts() reindexes in any case.
+        """
+        if self._index_source is not self.elements:
+            self._reindex()
+        return self._index
+
+    def _reindex(self):
+        """Build the interval index over elements as they are now"""
+        self._index = IntervalIndex(self.elements)
+        self._index_source = self.elements
+
     def sort(self):
         """Sort agenda by apointment start times"""
         self.elements.sort(key=lambda appt: appt.start)
 
+
+def common_free_slots(agendas: Sequence[Agenda], window_start: datetime, window_end: datetime,
+                      min_duration: timedelta = timedelta(0)) -> Agenda:
+    """The periods of at least min_duration between window_start and
+    window_end that are free in every one of agendas, as an agenda
+    of Appt described as 'free'.  The appointments of each agenda in
+    the window are already in start order, so we merge them like
+    sorted lists, in time O(m log N) for m appointments in N agendas.
+    """
+    slots = Agenda()
+    free_from = window_start
+    busy = [agenda.between(window_start, window_end) for agenda in agendas]
+    for appoint in heapq.merge(*busy, key=lambda appoint: appoint.start):
+        if appoint.start > free_from and appoint.start - free_from >= min_duration:
+            slots.append(Appt(free_from, appoint.start, "free"))
+        free_from = max(free_from, appoint.finish)
+    if window_end > free_from and window_end - free_from >= min_duration:
+        slots.append(Appt(free_from, window_end, "free"))
+    return slots
+
+
+class _Entry:
+    """An appointment as tracked by Agenda.track_conflicts,
+    numbered so that repeated appends of one Appt stay distinct
+    """
+    __slots__ = ("start", "finish", "appt", "seq")
+
+    def __init__(self, appt: Appt, seq: int):
+        self.start = appt.start
+        self.finish = appt.finish
+        self.appt = appt
+        self.seq = seq
+
+
+class ConflictCluster:
+    """A maximal group of appointments in an Agenda that are linked
+    by overlaps (see Agenda.conflict_clusters).  Its period runs from
+    the first start to the last finish of its appointments, and peak
+    is the most of them that are ever in progress at once.
+    """
+    def __init__(self, appts: List[Appt], finish: datetime, peak: int):
+        self.appts = appts
+        self.start = appts[0].start
+        self.finish = finish
+        self.peak = peak
+
+    def __len__(self) -> int:
+        return len(self.appts)
+
+    def __str__(self) -> str:
+        """Like an Appt, describing the cluster"""
+        return str(Appt(self.start, self.finish,
+                        f"{len(self.appts)} appointments, at most {self.peak} at once"))
+
+    def __repr__(self) -> str:
+        return f"ConflictCluster({repr(self.appts)}, {repr(self.finish)}, {self.peak})"
+
+
+class ConcurrencyProfile:
+    """How many appointments are in progress at once (see
+    Agenda.concurrency_profile):  counts[i] is the most at any
+    moment during the i'th bucket, which begins at origin + i * bucket,
+    and peak is the most at any moment at all.
+    """
+    def __init__(self, origin: datetime, bucket: timedelta, counts: array, peak: int):
+        self.origin = origin
+        self.bucket = bucket
+        self.counts = counts
+        self.peak = peak
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __repr__(self) -> str:
+        return (f"ConcurrencyProfile({repr(self.origin)}, {repr(self.bucket)}, "
+                f"{repr(self.counts)}, {self.peak})")
+
+
+class AgendaView:
+    """A read-only, always current window on an Agenda:  the
+    appointments that overlap a period (see Agenda.between and
+    Agenda.at), and the occurrences of its rules there.  It is
+    recomputed, by bisection, only when the agenda has changed
+    since it was last looked at.
+    """
+    def __init__(self, agenda: Agenda, start: datetime, finish: datetime):
+        self.agenda = agenda
+        self.start = start
+        self.finish = finish
+        self._seen = None   # The index and its version when last resolved
+
+    def _resolve(self):
+        """Bring the window up to date with the agenda"""
+        index = self.agenda._indexed()
+        rules = self.agenda.rules
+        if self._seen != (index, index.version, len(rules)):
+            self._before, self._items, self._lo, self._hi = index.window(self.start, self.finish)
+            if rules:
+                # Merge in the occurrences; at(t) is the window from t to just after
+                finish = self.finish if self.finish is not None else self.start + _TICK
+                streams = [self._before + self._items[self._lo:self._hi]]
+                streams.extend(rule.occurrences(self.start, finish) for rule in rules)
+                self._items = list(heapq.merge(*streams, key=lambda appoint: appoint.start))
+                self._before, self._lo, self._hi = [], 0, len(self._items)
+            self._seen = (index, index.version, len(rules))
+
+    def __len__(self) -> int:
+        self._resolve()
+        return len(self._before) + self._hi - self._lo
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Appt, list]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("AgendaView index out of range")
+        if i < len(self._before):
+            return self._before[i]
+        return self._items[self._lo + i - len(self._before)]
+
+    def __iter__(self) -> Iterator[Appt]:
+        self._resolve()
+        yield from self._before
+        for i in range(self._lo, self._hi):
+            yield self._items[i]
+
+    def __str__(self):
+        """Each Appt on its own line"""
+        return "\n".join(str(e) for e in self)
+
+    def __repr__(self) -> str:
+        return f"AgendaView({list(self)})"
+
 if __name__ == "__main__":
     print("Running usage examples")
     appt1 = Appt(datetime(2018, 3, 15, 13, 30), datetime(2018, 3, 15, 15, 30), "Early afternoon nap")
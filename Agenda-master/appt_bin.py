@@ -0,0 +1,187 @@
+"""
+A compact binary file format for agendas, read through mmap.
+
+Layout (all integers little-endian):
+    header    magic b"APPT", version, count, leaves
+    records   count fixed-size records, sorted by start time:
+                  start, finish (minutes since appt.EPOCH),
+                  offset and length of the description in the heap
+    maxima    the latest finish in each block of _BLOCK records, as
+              the leaves of a complete binary tree whose inner nodes
+              hold the latest finish below them:  2 * leaves int64s,
+              node 1 the root, nodes n*2 and n*2+1 the children of n
+    heap      the descriptions, UTF-8, each distinct one stored once
+
+MappedAgenda maps such a file into memory and reads records in
+place, so opening even a very large agenda is immediate.  Range
+queries by time use binary search over the records for the last
+start, and the tree of maxima to skip blocks that have finished
+before the first, so a few very long appointments do not make
+them scan the file.
+
+Usage:
+    with open("test_data/thousand.txt") as text:
+        text_to_binary(text, "thousand.appt")
+    with MappedAgenda("thousand.appt") as agenda:
+        print(agenda[0])
+        print(agenda.between(datetime(2018, 11, 21), datetime(2018, 11, 22)))
+"""
+
+import mmap
+import struct
+from datetime import datetime
+from typing import Iterable, Iterator, List, TextIO
+
+import appt
+import appt_io
+
+MAGIC = b"APPT"
+VERSION = 2
+_HEADER = struct.Struct("<4sHxxQQ")   # magic, version, count, leaves
+_RECORD = struct.Struct("<qqQI")      # start, finish, desc offset, desc length
+_MAXIMUM = struct.Struct("<q")        # a node of the tree of maxima
+_BLOCK = 64                           # Records per leaf of the tree
+_NONE = -(1 << 63)                    # Latest finish of no records
+
+
+def write_agenda(appts: Iterable[appt.Appt], path: str):
+    """Write appointments (e.g., an Agenda) to path in binary format.
+    Times are kept to the minute, like the text format.
+    """
+    rows = sorted(((appt.to_minutes(appoint.start), appt.to_minutes(appoint.finish),
+                    appoint.desc) for appoint in appts),
+                  key=lambda row: row[0])
+    heap = bytearray()
+    offsets = {}
+    records = bytearray(_RECORD.size * len(rows))
+    leaves = 1
+    while leaves * _BLOCK < len(rows):
+        leaves *= 2
+    maxima = [_NONE] * (2 * leaves)
+    for i, (start, finish, desc) in enumerate(rows):
+        if desc not in offsets:
+            encoded = desc.encode("utf-8")
+            offsets[desc] = (len(heap), len(encoded))
+            heap += encoded
+        offset, length = offsets[desc]
+        _RECORD.pack_into(records, i * _RECORD.size, start, finish, offset, length)
+        leaf = leaves + i // _BLOCK
+        maxima[leaf] = max(maxima[leaf], finish)
+    for node in range(leaves - 1, 0, -1):
+        maxima[node] = max(maxima[2 * node], maxima[2 * node + 1])
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(rows), leaves))
+        f.write(records)
+        f.write(struct.pack(f"<{len(maxima)}q", *maxima))
+        f.write(heap)
+
+
+class MappedAgenda:
+    """Read-only, random-access view of a binary agenda file.
+    Appt objects are created only for the records accessed.
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        magic, version, self._count, self._leaves = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} binary agenda")
+        self._maxima = _HEADER.size + self._count * _RECORD.size
+        self._heap = self._maxima + 2 * self._leaves * _MAXIMUM.size
+
+    def close(self):
+        self._view.release()
+        self._map.close()
+
+    def __enter__(self) -> 'MappedAgenda':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, i: int) -> appt.Appt:
+        if i < 0:
+            i += self._count
+        if not 0 <= i < self._count:
+            raise IndexError("MappedAgenda index out of range")
+        start, finish, offset, length = _RECORD.unpack_from(
+            self._view, _HEADER.size + i * _RECORD.size)
+        desc = str(self._view[self._heap + offset:self._heap + offset + length], "utf-8")
+        return appt.Appt(appt.from_minutes(start), appt.from_minutes(finish), desc)
+
+    def __iter__(self) -> Iterator[appt.Appt]:
+        for i in range(self._count):
+            yield self[i]
+
+    def _start(self, i: int) -> int:
+        return _RECORD.unpack_from(self._view, _HEADER.size + i * _RECORD.size)[0]
+
+    def _finish(self, i: int) -> int:
+        return _RECORD.unpack_from(self._view, _HEADER.size + i * _RECORD.size + 8)[0]
+
+    def _maximum(self, node: int) -> int:
+        """Latest finish of the records below node of the tree"""
+        return _MAXIMUM.unpack_from(self._view, self._maxima + node * _MAXIMUM.size)[0]
+
+    def _first_starting_at(self, minutes: int) -> int:
+        """Index of the first record starting at or after minutes"""
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._start(mid) < minutes:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def between(self, start: datetime, finish: datetime) -> List[appt.Appt]:
+        """Appointments that overlap the period from start to finish,
+        in order of start time
+        """
+        start_min, finish_min = appt.to_minutes(start), appt.to_minutes(finish)
+        # Records before hi start before finish; of those we want the
+        # ones that finish after start, found by descending the tree
+        # only into blocks (before hi) with a finish that late.
+        hi = self._first_starting_at(finish_min)
+        last_block = (hi - 1) // _BLOCK
+        found = []
+        pending = [(1, 0, self._leaves)] if hi else []   # node, its blocks first:end
+        while pending:
+            node, first, end = pending.pop()
+            if first > last_block or self._maximum(node) <= start_min:
+                continue
+            if end - first > 1:
+                mid = (first + end) // 2
+                pending.append((2 * node + 1, mid, end))
+                pending.append((2 * node, first, mid))
+                continue
+            for i in range(first * _BLOCK, min(hi, (first + 1) * _BLOCK)):
+                if self._finish(i) > start_min:
+                    found.append(self[i])
+        return found
+
+
+def read_agenda(path: str) -> appt.Agenda:
+    """The whole binary agenda at path as an Agenda"""
+    agenda = appt.Agenda()
+    with MappedAgenda(path) as mapped:
+        for appoint in mapped:
+            agenda.append(appoint)
+    return agenda
+
+
+def text_to_binary(text: Iterable[str], path: str):
+    """Convert an agenda in text format (see appt_io) to binary"""
+    write_agenda(appt_io.iter_appts(text), path)
+
+
+def binary_to_text(path: str, text: TextIO):
+    """Convert a binary agenda to text format, one Appt per line"""
+    with MappedAgenda(path) as mapped:
+        for appoint in mapped:
+            print(appoint, file=text)
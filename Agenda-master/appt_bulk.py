@@ -0,0 +1,101 @@
+"""
+Reading many agenda files (or one very large one) in parallel.
+
+load_agendas splits the work into jobs, one per file or, for large
+files, one per byte range, and parses the jobs in a pool of worker
+processes.  Each job comes back sorted by start time; the main
+process merges them into one sorted Agenda and reports the
+conflicts within each file.
+
+Usage:
+    agenda, conflicts = load_agendas(["alice.txt", "bob.txt"])
+    for path, found in conflicts.items():
+        print(f"{path}: {len(found)} conflicts")
+"""
+
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Sequence, Tuple
+
+import appt
+import appt_io
+
+# Files larger than this are split into byte ranges of this size
+CHUNK_BYTES = 1 << 24
+
+
+def _start(appoint: appt.Appt):
+    return appoint.start
+
+
+def _read_chunk(job: Tuple[str, int, int, bool]) -> Tuple[List[appt.Appt], appt.Agenda]:
+    """Parse the lines of a file that begin in the byte range
+    [begin, end), sorted by start time.  If the range is the whole
+    file, also find its conflicts (else the caller must, after
+    merging the ranges).
+    """
+    path, begin, end, whole = job
+    lines = []
+    with open(path, "rb") as f:
+        if begin > 0:
+            # The line in progress at begin belongs to the previous range
+            f.seek(begin - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            lines.append(line.decode("utf-8"))
+    agenda = appt_io.read_agenda(lines)
+    if whole:
+        conflicts = agenda.conflicts()
+    else:
+        agenda.sort()
+        conflicts = None
+    return agenda.elements, conflicts
+
+
+def load_agendas(paths: Sequence[str], max_workers: int = None,
+                 chunk_bytes: int = CHUNK_BYTES) -> Tuple[appt.Agenda, Dict[str, appt.Agenda]]:
+    """Read the agenda files in paths using a pool of max_workers
+    processes (default: one per CPU).  Returns a single Agenda with
+    all their appointments, sorted by start time, and a dict from
+    each path to the conflicts within that file (as Agenda.conflicts
+    would report them).
+    May throw exception if a line is not in proper format.
+    """
+    jobs = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if size <= chunk_bytes:
+            jobs.append((path, 0, size, True))
+        else:
+            for begin in range(0, size, chunk_bytes):
+                jobs.append((path, begin, min(begin + chunk_bytes, size), False))
+    per_file = {path: [] for path in paths}
+    reports = {}
+    workers = max_workers or os.cpu_count() or 1
+    # Hand small files to the workers in batches, to save round trips
+    batch = max(1, len(jobs) // (4 * workers))
+    with ProcessPoolExecutor(workers) as pool:
+        for (path, _, _, whole), (appts, conflicts) in zip(
+                jobs, pool.map(_read_chunk, jobs, chunksize=batch)):
+            per_file[path].append(appts)
+            if whole:
+                reports[path] = conflicts
+    sorted_files = []
+    for path, chunks in per_file.items():
+        if len(chunks) == 1:
+            sorted_files.append(chunks[0])
+            continue
+        # heapq.merge keeps ties in chunk order, so this is a stable sort of the file
+        merged = appt.Agenda()
+        for appoint in heapq.merge(*chunks, key=_start):
+            merged.append(appoint)
+        reports[path] = merged.conflicts()
+        sorted_files.append(merged.elements)
+    agenda = appt.Agenda()
+    for appoint in heapq.merge(*sorted_files, key=_start):
+        agenda.append(appoint)
+    return agenda, reports
@@ -0,0 +1,110 @@
+"""
+A compact, column-oriented alternative to appt.Agenda.
+
+A ColumnarAgenda stores start and finish times as arrays of
+minutes since appt.EPOCH (8 bytes each) and each description as
+a 4-byte index into a table of distinct descriptions.  Appt
+objects are created only when an element is accessed, so a large
+agenda takes a small fraction of the memory of a list of Appt.
+
+Times are kept to the minute, like the text format, so seconds
+and time zones of appended Appt objects are not preserved.
+
+Usage:
+    agenda = appt_io.read_agenda(open("test_data/thousand.txt"), ColumnarAgenda())
+    print(agenda.conflicts())
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Iterator, List
+
+from appt import Appt, Agenda, to_minutes, from_minutes
+
+
+class ColumnarAgenda:
+    """Like Agenda (append, len, str, conflicts, sort), but
+    stored as columns of integers.
+    """
+    def __init__(self):
+        self._starts = array('q')
+        self._finishes = array('q')
+        self._desc_ids = array('i')
+        # Each distinct description is stored once
+        self._descs: List[str] = []
+        self._desc_index = {}
+        self._sorted = True
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, i: int) -> Appt:
+        """The i'th appointment, as a new Appt object"""
+        return Appt(from_minutes(self._starts[i]), from_minutes(self._finishes[i]),
+                    self._descs[self._desc_ids[i]])
+
+    def __iter__(self) -> Iterator[Appt]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def iter_sorted(self) -> Iterator[Appt]:
+        """The appointments in order of start time (equal starts in
+        the order appended), made one at a time, without sorting the
+        agenda itself.  If it is not already sorted, we walk a
+        permutation of positions rather than the columns.
+        """
+        if self._sorted:
+            yield from self
+            return
+        order = array('q', sorted(range(len(self)), key=self._starts.__getitem__))
+        for i in order:
+            yield self[i]
+
+    def append(self, appt: Appt):
+        """Add appt to the columns"""
+        start = to_minutes(appt.start)
+        if self._sorted and self._starts and start < self._starts[-1]:
+            self._sorted = False
+        desc_id = self._desc_index.get(appt.desc)
+        if desc_id is None:
+            desc_id = len(self._descs)
+            self._descs.append(appt.desc)
+            self._desc_index[appt.desc] = desc_id
+        self._starts.append(start)
+        self._finishes.append(to_minutes(appt.finish))
+        self._desc_ids.append(desc_id)
+
+    def __str__(self):
+        """Each Appt on its own line"""
+        return "\n".join(str(appt) for appt in self)
+
+    def __repr__(self) -> str:
+        return f"ColumnarAgenda(<{len(self)} appointments>)"
+
+    def sort(self):
+        """Sort agenda by appointment start times"""
+        if self._sorted:
+            return
+        order = sorted(range(len(self)), key=self._starts.__getitem__)
+        self._starts = array('q', (self._starts[i] for i in order))
+        self._finishes = array('q', (self._finishes[i] for i in order))
+        self._desc_ids = array('i', (self._desc_ids[i] for i in order))
+        self._sorted = True
+
+    def conflicts(self) -> Agenda:
+        """Returns an agenda consisting of the conflicts
+        (overlaps) between appointments in this agenda,
+        the same as Agenda.conflicts would.
+        Side effect: this agenda is sorted
+        """
+        self.sort()
+        starts, finishes = self._starts, self._finishes
+        descs, desc_ids = self._descs, self._desc_ids
+        agenda_conflicts = Agenda()
+        for i, finish in enumerate(finishes):
+            # Sorted by start, so everything starting before we finish overlaps us
+            for j in range(i + 1, bisect_left(starts, finish, i + 1)):
+                agenda_conflicts.append(Appt(from_minutes(starts[j]),
+                                             from_minutes(min(finish, finishes[j])),
+                                             f"{descs[desc_ids[i]]} and {descs[desc_ids[j]]}"))
+        return agenda_conflicts
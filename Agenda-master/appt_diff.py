@@ -0,0 +1,130 @@
+"""
+Comparing and merging versions of an agenda.
+
+Both work like merging sorted lists:  they walk the versions in
+order of start time, side by side, holding only the appointments
+that share a start time.  So they work on streams (appt_io.iter_appts
+over a sorted file, appt_bin.MappedAgenda) or compact agendas
+(appt_columnar.ColumnarAgenda) as well as on Agenda, in time
+O(n log n) for agendas that need sorting and O(n) for sorted streams.
+
+Appointments are matched by period (start and finish).  An
+appointment whose description differs between versions is "changed";
+one whose period differs is "removed" from one period and "added" to
+another.
+
+Usage:
+    for kind, old, new in diff(yesterday, today):
+        print(kind, old, new)
+    conflicts = []
+    merged = ColumnarAgenda()
+    for appoint in merge3(base, mine, yours, conflicts):
+        merged.append(appoint)
+"""
+
+import heapq
+from collections import Counter
+from datetime import datetime
+from itertools import groupby
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from appt import Appt
+
+
+def _periods(appts: Iterable[Appt]) -> Iterator[Tuple[Tuple[datetime, datetime], List[str]]]:
+    """((start, finish), descriptions) for each distinct period, in
+    order.  Nothing passed in is sorted in place:  a ColumnarAgenda is
+    walked in order without building all its appointments at once,
+    and Agendas and lists are walked in a sorted copy.  Other
+    iterables must already be in order of start time, or we raise
+    ValueError.
+    """
+    if hasattr(appts, "iter_sorted"):
+        appts = appts.iter_sorted()
+    elif isinstance(appts, list) or hasattr(appts, "sort"):
+        appts = sorted(appts, key=lambda appoint: appoint.start)
+    latest = None
+    for start, group in groupby(appts, key=lambda appoint: appoint.start):
+        if latest is not None and start < latest:
+            raise ValueError(f"Appointments out of order at {start}")
+        latest = start
+        by_finish = sorted((appoint.finish, appoint.desc) for appoint in group)
+        for finish, same in groupby(by_finish, key=lambda pair: pair[0]):
+            yield (start, finish), [desc for _, desc in same]
+
+
+def _tagged(side: int, appts: Iterable[Appt]) -> Iterator[tuple]:
+    """(period, side, descriptions) for each period in appts"""
+    for period, descs in _periods(appts):
+        yield period, side, descs
+
+
+def _side_by_side(*versions: Iterable[Appt]) -> Iterator[Tuple[Tuple[datetime, datetime], list]]:
+    """For each period in any of the versions, in order, the period and
+    a list of the descriptions it has in each version (empty if none)
+    """
+    tagged = [_tagged(side, version) for side, version in enumerate(versions)]
+    for period, entries in groupby(heapq.merge(*tagged), key=lambda entry: entry[0]):
+        descs = [[] for _ in versions]
+        for _, side, found in entries:
+            descs[side] = found
+        yield period, descs
+
+
+def diff(old: Iterable[Appt], new: Iterable[Appt]) -> Iterator[Tuple[str, Optional[Appt], Optional[Appt]]]:
+    """The differences from old to new, in order of start time, as
+    ("added", None, appt), ("removed", appt, None) or
+    ("changed", old_appt, new_appt) for a changed description.
+    """
+    for (start, finish), (old_descs, new_descs) in _side_by_side(old, new):
+        if old_descs == new_descs:
+            continue
+        removed = list((Counter(old_descs) - Counter(new_descs)).elements())
+        added = list((Counter(new_descs) - Counter(old_descs)).elements())
+        for old_desc, new_desc in zip(removed, added):
+            yield "changed", Appt(start, finish, old_desc), Appt(start, finish, new_desc)
+        for old_desc in removed[len(added):]:
+            yield "removed", Appt(start, finish, old_desc), None
+        for new_desc in added[len(removed):]:
+            yield "added", None, Appt(start, finish, new_desc)
+
+
+class MergeConflict:
+    """A period that ours and theirs both changed from base, differently.
+    base, ours and theirs are its descriptions in each (empty if absent).
+    """
+    def __init__(self, start: datetime, finish: datetime,
+                 base: List[str], ours: List[str], theirs: List[str]):
+        self.start = start
+        self.finish = finish
+        self.base = base
+        self.ours = ours
+        self.theirs = theirs
+
+    def __str__(self) -> str:
+        period = str(Appt(self.start, self.finish, ""))
+        return f"{period} base {self.base}, ours {self.ours}, theirs {self.theirs}"
+
+    def __repr__(self) -> str:
+        return (f"MergeConflict({repr(self.start)}, {repr(self.finish)}, "
+                f"{repr(self.base)}, {repr(self.ours)}, {repr(self.theirs)})")
+
+
+def merge3(base: Iterable[Appt], ours: Iterable[Appt], theirs: Iterable[Appt],
+           conflicts: List[MergeConflict] = None) -> Iterator[Appt]:
+    """Three-way merge:  the appointments of ours with the changes
+    from base to theirs applied, in order of start time.  Where ours
+    and theirs changed the same period differently, ours is kept and
+    a MergeConflict is appended to conflicts (if given).
+    """
+    for (start, finish), (base_descs, our_descs, their_descs) in _side_by_side(base, ours, theirs):
+        if our_descs == their_descs or their_descs == base_descs:
+            keep = our_descs
+        elif our_descs == base_descs:
+            keep = their_descs
+        else:
+            keep = our_descs
+            if conflicts is not None:
+                conflicts.append(MergeConflict(start, finish, base_descs, our_descs, their_descs))
+        for desc in keep:
+            yield Appt(start, finish, desc)
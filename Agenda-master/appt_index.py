@@ -0,0 +1,321 @@
+"""
+An interval index for Appt objects.
+
+IntervalIndex keeps appointments sorted by start time, together
+with a centered interval tree over them, so that we can ask which
+appointments overlap a period (or are in progress at an instant)
+without scanning the whole agenda.  It works for any objects with
+start and finish attributes, and treats each period as half-open:
+it includes its start but not its finish, like Appt.overlaps.
+
+Appending is cheap.  The items are kept in a few static levels,
+each sorted by start with an interval tree of its own, whose sizes
+at least double from the newest to the oldest (the "logarithmic
+method" of Bentley and Saxe).  A new item waits in a short pending
+list; when that fills up it becomes a level, merged with the newer
+levels no bigger than it.  So each item is merged O(log n) times
+over its life, and no append rebuilds the whole index.  A query
+asks each of the O(log n) levels in turn.  Removed items are marked
+dead in their level, which is rebuilt once half of it is dead.
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from typing import Any, Iterable, Iterator, List, Tuple
+
+# Pending items we scan before they become a level of their own
+_BUFFER = 32
+
+
+def _start(item: Any):
+    return item.start
+
+
+class _Node:
+    """A node of the centered interval tree.  Holds the positions
+    of the periods that contain the center point, sorted by start
+    (ascending) and by finish (descending).
+    """
+    __slots__ = ("center", "by_start", "by_finish", "left", "right")
+
+    def __init__(self, center, by_start: List[int], by_finish: List[int],
+                 left: '_Node', right: '_Node'):
+        self.center = center
+        self.by_start = by_start
+        self.by_finish = by_finish
+        self.left = left
+        self.right = right
+
+
+class _Level:
+    """A static index over some of the items:  sorted by start, with
+    a centered interval tree built the first time it is needed.
+    Removed items stay in place, marked dead.
+    """
+    __slots__ = ("starts", "finishes", "items", "dead", "tree")
+
+    def __init__(self, items: List[Any]):
+        """items must be in start order"""
+        self.items = items
+        self.starts = [item.start for item in items]
+        self.finishes = [item.finish for item in items]
+        self.dead = set()
+        self.tree = None
+
+    def __len__(self) -> int:
+        return len(self.items) - len(self.dead)
+
+    def live(self) -> List[Any]:
+        """Items not removed, in start order"""
+        if not self.dead:
+            return self.items
+        dead = self.dead
+        return [item for pos, item in enumerate(self.items) if pos not in dead]
+
+    def find(self, item: Any) -> int:
+        """Position of this very item, or -1"""
+        lo = bisect_left(self.starts, item.start)
+        hi = bisect_right(self.starts, item.start, lo)
+        for pos in range(lo, hi):
+            if self.items[pos] is item and pos not in self.dead:
+                return pos
+        return -1
+
+    def overlapping(self, start, finish) -> List[int]:
+        """Live positions overlapping the period from start to finish"""
+        # Either the item is already in progress at start,
+        # or it begins strictly between start and finish.
+        found = self.stab(start)
+        lo = bisect_right(self.starts, start)
+        hi = bisect_left(self.starts, finish, lo)
+        dead = self.dead
+        found.extend(pos for pos in range(lo, hi) if pos not in dead)
+        return found
+
+    def any_dead(self, lo: int, hi: int) -> bool:
+        """Is any position in range(lo, hi) dead?"""
+        dead = self.dead
+        if len(dead) < hi - lo:
+            return any(lo <= pos < hi for pos in dead)
+        return any(pos in dead for pos in range(lo, hi))
+
+    def stab(self, t) -> List[int]:
+        """Live positions whose period contains t"""
+        if self.tree is None:
+            self.tree = self._build(list(range(len(self.items))))
+        starts, finishes, dead = self.starts, self.finishes, self.dead
+        found = []
+        node = self.tree
+        while node is not None:
+            if t < node.center:
+                for pos in node.by_start:
+                    if starts[pos] > t:
+                        break
+                    found.append(pos)
+                node = node.left
+            else:
+                for pos in node.by_finish:
+                    if finishes[pos] <= t:
+                        break
+                    found.append(pos)
+                node = node.right
+        if dead:
+            found = [pos for pos in found if pos not in dead]
+        return found
+
+    def _build(self, positions: List[int]) -> '_Node':
+        """Interval tree over positions, which are in start order"""
+        if not positions:
+            return None
+        starts, finishes = self.starts, self.finishes
+        center = starts[positions[len(positions) // 2]]
+        left, here, right = [], [], []
+        for pos in positions:
+            if finishes[pos] <= center:
+                left.append(pos)
+            elif starts[pos] > center:
+                right.append(pos)
+            else:
+                here.append(pos)
+        by_finish = sorted(here, key=finishes.__getitem__, reverse=True)
+        return _Node(center, here, by_finish, self._build(left), self._build(right))
+
+
+class IntervalIndex:
+    """Appointments sorted by start, with interval trees for
+    stabbing queries.
+      index.add(item)                    O(log n) amortized, plus
+                                         O(log^2 n) for trees later queried
+      index.remove(item)                 O(log^2 n) amortized
+      index.overlapping(start, finish)   O(log^2 n + k)
+      index.containing(t)                O(log^2 n + k)
+      index.pairs()                      O(n log n + k) for all k pairs
+      index.window(start, finish)        O(log^2 n + k), without copying
+    Results are always in start order; appointments with equal
+    start times stay in the order they were added.
+    """
+
+    def __init__(self, items: Iterable[Any] = ()):
+        # Oldest (and biggest) first; each sorted by start
+        self._levels: List[_Level] = []
+        # Newest items, not yet in a level, in the order added
+        self._pending = []
+        items = sorted(items, key=_start)
+        if items:
+            self._levels.append(_Level(items))
+        self._count = len(items)
+        # Changes with every add or remove, so views can tell they are stale
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Any]:
+        """Live items in start order"""
+        self._collapse()
+        return iter(self._levels[0].items if self._levels else [])
+
+    def add(self, item: Any):
+        """Add an item"""
+        self._pending.append(item)
+        self._count += 1
+        self.version += 1
+        if len(self._pending) >= _BUFFER:
+            self._flush()
+
+    def remove(self, item: Any):
+        """Remove this very item (by identity, not ==).
+        Raises ValueError if it is not in the index.
+        """
+        for i in range(len(self._pending) - 1, -1, -1):
+            if self._pending[i] is item:
+                del self._pending[i]
+                self._removed()
+                return
+        for i, level in enumerate(self._levels):
+            pos = level.find(item)
+            if pos >= 0:
+                level.dead.add(pos)
+                if 2 * len(level.dead) > len(level.items):
+                    live = level.live()
+                    if live:
+                        self._levels[i] = _Level(live)
+                    else:
+                        del self._levels[i]
+                self._removed()
+                return
+        raise ValueError(f"{item!r} is not in the index")
+
+    def _removed(self):
+        self._count -= 1
+        self.version += 1
+
+    def containing(self, t) -> List[Any]:
+        """Items in progress at t, i.e., start <= t < finish"""
+        return self._collect([level.stab(t) for level in self._levels],
+                             lambda item: item.start <= t < item.finish)
+
+    def overlapping(self, start, finish) -> List[Any]:
+        """Items with a non-zero overlap with the period from start to finish"""
+        return self._collect([level.overlapping(start, finish) for level in self._levels],
+                             lambda item: item.start < finish and start < item.finish)
+
+    def window(self, start, finish=None) -> Tuple[List[Any], List[Any], int, int]:
+        """The items overlapping the period from start to finish
+        (or in progress at the instant start, if finish is None),
+        as (before, items, lo, hi):  those that began before start,
+        followed by the slice items[lo:hi] of an internal list, which
+        is never changed in place.  If newer levels, pending items or
+        removed items fall in the window, items is instead a new list
+        of all of them (and before is empty), found as overlapping
+        finds them.
+        """
+        if finish is None:
+            overlaps = lambda item: item.start <= start < item.finish
+            search = lambda level: level.stab(start)
+        else:
+            overlaps = lambda item: item.start < finish and start < item.finish
+            search = lambda level: level.overlapping(start, finish)
+        if not self._levels:
+            items = [item for item in self._pending if overlaps(item)]
+            items.sort(key=_start)
+            return [], items, 0, len(items)
+        oldest = self._levels[0]
+        lo = bisect_left(oldest.starts, start)
+        if finish is None:
+            hi = bisect_right(oldest.starts, start, lo)
+        else:
+            hi = bisect_left(oldest.starts, finish, lo)
+        if (any(search(level) for level in self._levels[1:])
+                or any(overlaps(item) for item in self._pending)
+                or (oldest.dead and oldest.any_dead(lo, hi))):
+            # We cannot slice around these
+            if finish is None:
+                items = self.containing(start)
+            else:
+                items = self.overlapping(start, finish)
+            return [], items, 0, len(items)
+        before = sorted(pos for pos in oldest.stab(start) if oldest.starts[pos] < start)
+        return [oldest.items[pos] for pos in before], oldest.items, lo, hi
+
+    def pairs(self) -> Iterator[Tuple[Any, Any]]:
+        """Every overlapping pair (a, b), with a before b in start order"""
+        self._collapse()
+        if not self._levels:
+            return
+        level = self._levels[0]
+        starts = level.starts
+        items = level.items
+        for i, finish in enumerate(level.finishes):
+            # Everything starting before we finish overlaps us
+            for j in range(i + 1, bisect_left(starts, finish, i + 1)):
+                yield items[i], items[j]
+
+    def _flush(self):
+        """Make the pending items a level, merged with the newer
+        levels that are no bigger than it
+        """
+        items = self._pending
+        self._pending = []
+        # Stable, so equal starts keep the order they were added in
+        items.sort(key=_start)
+        while self._levels and len(self._levels[-1]) <= len(items):
+            # Two sorted runs, which sort merges in linear time;
+            # the older level goes first, again for stability
+            items = self._levels.pop().live() + items
+            items.sort(key=_start)
+        if items:
+            self._levels.append(_Level(items))
+
+    def _collapse(self):
+        """Merge everything into a single level with no dead items"""
+        if (len(self._levels) <= 1 and not self._pending
+                and not (self._levels and self._levels[0].dead)):
+            return
+        items = []
+        for level in self._levels:
+            items.extend(level.live())
+        self._pending.sort(key=_start)
+        items.extend(self._pending)
+        items.sort(key=_start)
+        self._levels = [_Level(items)] if items else []
+        self._pending = []
+
+    def _collect(self, found: List[List[int]], test) -> List[Any]:
+        """Positions found in each level, plus matching pending
+        items, as items in start order.
+        """
+        streams = []
+        for level, positions in zip(self._levels, found):
+            if positions:
+                positions.sort()
+                items = level.items
+                streams.append([items[pos] for pos in positions])
+        extra = [item for item in self._pending if test(item)]
+        if extra:
+            extra.sort(key=_start)
+            streams.append(extra)
+        if len(streams) == 1:
+            return streams[0]
+        # Older levels first, so equal starts stay in the order added
+        return list(heapq.merge(*streams, key=_start))
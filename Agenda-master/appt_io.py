@@ -7,7 +7,61 @@ parse_agenda is inverse of Agenda.text
 
 import appt
 import datetime
-from typing import Iterable
+import functools
+from typing import Iterable, Iterator, Tuple
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(date_text: str) -> Tuple[int, int, int]:
+    """(year, month, day) from yyyy-mm-dd, checked to be a real date.
+    Cached, since agendas have many appointments on the same day.
+    """
+    date = datetime.date(int(date_text[0:4]), int(date_text[5:7]), int(date_text[8:10]))
+    return date.year, date.month, date.day
+
+
+def _parse_fixed_width(appt_text: str) -> appt.Appt:
+    """Fast path for parse_appt, for the exact layouts that
+    Appt.__str__ produces, for one day and for several days:
+        0         1         2         3
+        01234567890123456789012345678901234
+        2018-05-03 15:40 16:15 | Study hard
+        2018-05-03 22:00 2018-05-04 06:00 | Night shift
+    Returns None if appt_text is not laid out exactly this way
+    (or is not valid), so the general parser can decide.
+    """
+    if appt_text[22:24] == " |":
+        # Finish time, on the start date, at 17
+        finish_date, bar = appt_text[0:10], 22
+    elif appt_text[33:35] == " |" and appt_text[27] == " ":
+        # Finish date at 17, finish time at 28
+        finish_date, bar = appt_text[17:27], 33
+    else:
+        return None
+    start_date = appt_text[0:10]
+    start_time = appt_text[11:16]
+    finish_time = appt_text[bar - 5:bar]
+    if (appt_text[10] != " " or appt_text[16] != " "
+            or start_date[4] != "-" or start_date[7] != "-"
+            or finish_date[4] != "-" or finish_date[7] != "-"
+            or start_time[2] != ":" or finish_time[2] != ":"):
+        return None
+    digits = (start_date[0:4] + start_date[5:7] + start_date[8:10]
+              + finish_date[0:4] + finish_date[5:7] + finish_date[8:10]
+              + start_time[0:2] + start_time[3:5] + finish_time[0:2] + finish_time[3:5])
+    desc = appt_text[bar + 2:]
+    if not (digits.isascii() and digits.isdigit()) or "|" in desc:
+        return None
+    try:
+        year, month, day = _parse_date(start_date)
+        period_start = datetime.datetime(year, month, day,
+                                         int(start_time[0:2]), int(start_time[3:5]))
+        year, month, day = _parse_date(finish_date)
+        period_finish = datetime.datetime(year, month, day,
+                                          int(finish_time[0:2]), int(finish_time[3:5]))
+    except ValueError:
+        return None
+    return appt.Appt(period_start, period_finish, desc)
 
 
 def parse_appt(appt_text: str) -> appt.Appt:
@@ -18,36 +72,61 @@ def parse_appt(appt_text: str) -> appt.Appt:
     Date must be yyyy-mm-dd  (with leading zeros if needed)
     Times are in 24 hour format, with leading zeros if needed,
     e.g., 03:00 is 3am and 15:00 is 3pm.
+    An appointment that ends on a later day gives the finish
+    date too, like "2018-05-03 22:00 2018-05-04 06:00 | Night shift".
     Note this is inverse of the Appt.__str__ method.
     """
+    parsed = _parse_fixed_width(appt_text)
+    if parsed is not None:
+        return parsed
     try:
         period, desc = appt_text.split('|')
-        date, start, finish = period.split()
+        fields = period.split()
+        if len(fields) == 3:
+            date, start, finish = fields
+            finish_date = date
+        elif len(fields) == 4:
+            date, start, finish_date, finish = fields
+        else:
+            raise ValueError(f"expected date, time, [date,] time; got {len(fields)} fields")
         # In Python 3.7 we could do:
         # period_start = datetime.fromisoformat(f"{date}T{start}")
         # period_finish = datetime.fromisoformat(f"{date}T{finish}")
         # In Python 3.6 we need to use strptime
         iso_8601_fmt = "%Y-%m-%dT%H:%M"
         period_start = datetime.datetime.strptime(f"{date}T{start}", iso_8601_fmt)
-        period_finish = datetime.datetime.strptime(f"{date}T{finish}", iso_8601_fmt)
+        period_finish = datetime.datetime.strptime(f"{finish_date}T{finish}", iso_8601_fmt)
     except Exception as err:
         raise ValueError(f"*** Failed to parse '{appt_text}' ***\n{err}")
     return appt.Appt(period_start, period_finish, desc)
 
 
-def read_agenda(file: Iterable[str]) -> appt.Agenda:
-    """Read an agenda from a file or list of str.
+def iter_appts(file: Iterable[str]) -> Iterator[appt.Appt]:
+    """Appointments from a file or list of str, one at a time,
+    so that a large file need not be held in memory.
     Skips comments and blank lines.
     May throw exception if a line is not in proper format.
     """
-    agenda = appt.Agenda()
     for line in file:
         line = line.strip()
         # Trim trailing comment (or whole line)
         line = line.split("#")[0]
         if len(line) > 0:
             # Remaining content should be an appointment spec
-            agenda.append(parse_appt(line))
+            yield parse_appt(line)
+
+
+def read_agenda(file: Iterable[str], agenda=None) -> appt.Agenda:
+    """Read an agenda from a file or list of str.
+    Skips comments and blank lines.
+    May throw exception if a line is not in proper format.
+    Appointments are appended to agenda if it is given (e.g.,
+    an appt_columnar.ColumnarAgenda), else to a new Agenda.
+    """
+    if agenda is None:
+        agenda = appt.Agenda()
+    for appoint in iter_appts(file):
+        agenda.append(appoint)
     return agenda
 
 
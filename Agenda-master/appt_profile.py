@@ -0,0 +1,116 @@
+"""
+Opt-in profiling of the main Agenda operations.
+
+enable() wraps parse_appt, read_agenda, Agenda.sort, Agenda.conflicts,
+Appt.overlaps and Appt.intersect so that each call is counted and
+timed; disable() puts the originals back.  Until enable() is called
+nothing is wrapped, so there is no cost at all.  Times are cumulative:
+the time of read_agenda includes the time of the parse_appt calls it
+makes.  Only calls made through the modules are seen, e.g.
+appt_io.parse_appt(...), not a parse_appt imported before enable().
+
+Usage, from a program:
+    appt_profile.enable(at_exit=sys.stderr, fmt="json")
+Or around a whole program:
+    python3 appt_profile.py [--json] [--output FILE] program.py [args]
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import runpy
+import sys
+import time
+from typing import Callable, Dict, List, TextIO
+
+import appt
+import appt_io
+
+# What we instrument:  (owner, attribute name, name in reports)
+TARGETS = [
+    (appt_io, "parse_appt", "parse_appt"),
+    (appt_io, "read_agenda", "read_agenda"),
+    (appt.Agenda, "sort", "Agenda.sort"),
+    (appt.Agenda, "conflicts", "Agenda.conflicts"),
+    (appt.Appt, "overlaps", "Appt.overlaps"),
+    (appt.Appt, "intersect", "Appt.intersect"),
+]
+
+# name in reports -> [calls, seconds]
+_stats: Dict[str, List] = {}
+# (owner, attribute name, original) for each wrapped target
+_originals = []
+
+
+def _timed(name: str, func: Callable) -> Callable:
+    """func, counting its calls and their time in _stats[name]"""
+    stats = _stats.setdefault(name, [0, 0.0])
+    clock = time.perf_counter
+
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        before = clock()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats[0] += 1
+            stats[1] += clock() - before
+    return timed
+
+
+def enable(at_exit: TextIO = None, fmt: str = "text"):
+    """Start counting and timing.  If at_exit is given, the report
+    is written to it (in fmt, "text" or "json") when Python exits.
+    """
+    if not _originals:
+        for owner, attr, name in TARGETS:
+            original = owner.__dict__[attr] if isinstance(owner, type) else getattr(owner, attr)
+            _originals.append((owner, attr, original))
+            setattr(owner, attr, _timed(name, original))
+    if at_exit is not None:
+        atexit.register(lambda: at_exit.write(report(fmt) + "\n"))
+
+
+def disable():
+    """Stop counting and timing; the counts so far are kept"""
+    while _originals:
+        owner, attr, original = _originals.pop()
+        setattr(owner, attr, original)
+
+
+def reset():
+    """Forget the counts so far"""
+    for stats in _stats.values():
+        stats[0] = 0
+        stats[1] = 0.0
+
+
+def report(fmt: str = "text") -> str:
+    """Counts and times so far, as a table or as JSON"""
+    rows = {name: {"calls": calls, "seconds": seconds}
+            for name, (calls, seconds) in _stats.items()}
+    if fmt == "json":
+        return json.dumps(rows, indent=2)
+    lines = [f"{'operation':<20} {'calls':>10} {'seconds':>12} {'usec/call':>10}"]
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]["seconds"]):
+        per_call = 1e6 * row["seconds"] / row["calls"] if row["calls"] else 0.0
+        lines.append(f"{name:<20} {row['calls']:>10} {row['seconds']:>12.6f} {per_call:>10.2f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a program with Agenda profiling enabled")
+    parser.add_argument("--json", action="store_true", help="Report as JSON")
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stderr,
+                        help="Where to write the report (default stderr)")
+    parser.add_argument("program", help="Python program to run")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Its arguments")
+    args = parser.parse_args()
+    sys.argv = [args.program] + args.args
+    enable(at_exit=args.output, fmt="json" if args.json else "text")
+    runpy.run_path(args.program, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
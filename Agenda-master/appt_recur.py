@@ -0,0 +1,116 @@
+"""
+Recurring appointments, stored as rules and expanded lazily.
+
+A Recurrence describes a standing appointment, like "every 2 days",
+"every 4 hours" or "Mondays and Wednesdays", optionally ending after
+a number of occurrences or at a date.  Only the occurrences in a
+window we ask about are ever created, so a rule covering many years
+costs no more than a single Appt.
+
+Two rules repeat with a common period (the least common multiple of
+their periods), so whether they ever conflict can be decided by
+looking at one such period, however long the rules run.
+
+Usage:
+    standup = Recurrence(parse_appt("2019-01-07 09:00 09:15 | standup"),
+                         every=timedelta(days=1))
+    review = Recurrence(parse_appt("2019-01-07 09:10 10:00 | review"),
+                        weekdays=[FRIDAY])
+    print(standup.first_conflict(review))
+"""
+
+import heapq
+from datetime import datetime, timedelta
+from math import gcd
+from typing import Iterable, Iterator, Optional
+
+from appt import Appt
+
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY, FRIDAY, SATURDAY, SUNDAY = range(7)
+
+_TICK = timedelta(microseconds=1)
+
+
+class Recurrence:
+    """Occurrences of first, repeated every period.  With weekdays
+    (0 is Monday, as for datetime.weekday), they are repeated on each
+    of those days of the week instead, in each period (one week by
+    default).  Ends after count occurrences, and/or with the last
+    occurrence starting before until, or never.
+    """
+    def __init__(self, first: Appt, every: timedelta = None,
+                 weekdays: Iterable[int] = None, count: int = None,
+                 until: datetime = None):
+        if every is None:
+            assert weekdays is not None, "Recurrence needs every and/or weekdays"
+            every = timedelta(weeks=1)
+        assert every > timedelta(0), f"Recurrence period ({every}) must be positive"
+        self.first = first
+        self.period = every
+        # Occurrences are at first.start + k * period + each offset
+        if weekdays is None:
+            self.offsets = [timedelta(0)]
+        else:
+            self.offsets = sorted({timedelta(days=(day - first.start.weekday()) % 7)
+                                   for day in weekdays})
+            assert self.offsets[-1] < every, f"Weekdays do not fit in a period of {every}"
+        self.count = count
+        self.until = until
+        self.duration = first.finish - first.start
+
+    def __repr__(self) -> str:
+        return (f"Recurrence({repr(self.first)}, every={repr(self.period)}, "
+                f"offsets={repr(self.offsets)}, count={self.count}, until={repr(self.until)})")
+
+    def occurrences(self, window_start: datetime = None,
+                    window_end: datetime = None) -> Iterator[Appt]:
+        """The occurrences that overlap the period from window_start to
+        window_end (or all of them, in either direction), in start order,
+        created one at a time.
+        """
+        per_period = len(self.offsets)
+        n = 0
+        if window_start is not None:
+            # Skip whole periods that finish before the window
+            skip = (window_start - self.duration - self.first.start) // self.period
+            n = max(0, skip) * per_period
+        while self.count is None or n < self.count:
+            k, j = divmod(n, per_period)
+            start = self.first.start + k * self.period + self.offsets[j]
+            if ((self.until is not None and start >= self.until)
+                    or (window_end is not None and start >= window_end)):
+                return
+            finish = start + self.duration
+            if window_start is None or finish > window_start:
+                yield Appt(start, finish, self.first.desc)
+            n += 1
+
+    def conflicts(self, other: 'Recurrence', window_start: datetime = None,
+                  window_end: datetime = None) -> Iterator[Appt]:
+        """Conflicts between occurrences of self and occurrences of other
+        in a window, in order of the later occurrence of each pair.
+        Occurrences of the same rule are not compared with each other.
+        """
+        mine = ((appoint.start, 0, appoint) for appoint in self.occurrences(window_start, window_end))
+        theirs = ((appoint.start, 1, appoint) for appoint in other.occurrences(window_start, window_end))
+        active = ([], [])
+        for _, side, appoint in heapq.merge(mine, theirs):
+            opposite = [earlier for earlier in active[1 - side] if earlier.finish > appoint.start]
+            active = (active[0], opposite) if side == 0 else (opposite, active[1])
+            for earlier in opposite:
+                yield earlier.intersect(appoint)
+            active[side].append(appoint)
+
+    def first_conflict(self, other: 'Recurrence') -> Optional[Appt]:
+        """The earliest conflict between occurrences of self and of
+        other, or None if they never conflict.  Since the two rules
+        line up the same way every common period, only one common
+        period (after both have begun) needs to be examined.
+        """
+        mine, theirs = self.period // _TICK, other.period // _TICK
+        # math.lcm needs Python 3.9
+        common = mine * theirs // gcd(mine, theirs) * _TICK
+        begin = min(self.first.start, other.first.start)
+        end = (max(self.first.start, other.first.start) + common
+               + max(self.duration, other.duration))
+        return next(self.conflicts(other, begin, end), None)
@@ -0,0 +1,204 @@
+"""
+An agenda service:  an asyncio server that keeps one Agenda in memory
+and answers requests from local clients.
+
+The protocol is JSON, one object per line in each direction.  Each
+request has an "op" and, for some ops, more fields; the reply has
+"ok" (and "error" if not ok), and echoes the request's "id" if any.
+    {"op": "append", "appt": "2019-01-08 10:00 11:20 | lecture"}
+    {"op": "remove", "appt": "2019-01-08 10:00 11:20 | lecture"}
+                                            (period and description must match)
+    {"op": "conflicts"}                     -> "conflicts": [appt text, ...]
+    {"op": "between", "start": "2019-01-08 00:00", "finish": "2019-01-09 00:00"}
+                                            -> "appts": [appt text, ...]
+    {"op": "stats"}                         -> "stats": {...}
+
+Requests from all connections go through one queue.  Whatever has
+piled up while the agenda was busy is handled as a batch, in order
+of arrival.  Appends and removes are applied one at a time (appends
+are cheap anyway, since the agenda's index takes them in O(log n)
+amortized time), and queries that come between two changes share one
+look-up (one conflict listing, one range query per distinct range).
+
+Usage:
+    python3 appt_server.py --port 2110 test_data/cis211.txt
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import List, Tuple
+
+import appt
+import appt_io
+
+
+class AgendaServer:
+    """Serves one agenda (which tracks its conflicts) to many clients"""
+
+    def __init__(self, agenda: appt.Agenda = None):
+        self.agenda = agenda if agenda is not None else appt.Agenda()
+        self.agenda.track_conflicts()
+        self._queue = asyncio.Queue()
+        self._server = None
+        self._batcher = None
+        self._handlers = set()   # One task per connected client
+        self._started = time.perf_counter()
+        self.stats = {"requests": 0, "batches": 0, "errors": 0, "largest_batch": 0,
+                      "total_latency": 0.0, "max_latency": 0.0}
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start serving; returns the port (useful if port 0 picked one)"""
+        self._batcher = asyncio.create_task(self._run_batches())
+        self._server = await asyncio.start_server(self._serve_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """Stop accepting clients, hang up on those connected, and stop"""
+        self._server.close()
+        for handler in list(self._handlers):
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        await asyncio.gather(self._batcher, return_exceptions=True)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Pass each request line to the batcher, and write back its reply"""
+        self._handlers.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = asyncio.get_running_loop().create_future()
+                await self._queue.put((line, reply, time.perf_counter()))
+                writer.write(json.dumps(await reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+            self._handlers.discard(asyncio.current_task())
+
+    async def _run_batches(self):
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._handle_batch(batch)
+
+    def _handle_batch(self, batch: List[Tuple[bytes, asyncio.Future, float]]):
+        """Answer a batch of requests in order of arrival, sharing
+        query results between requests not separated by a change
+        """
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        answers = {}   # Query results since the last change
+        for line, reply, arrived in batch:
+            request = {}
+            try:
+                request = json.loads(line)
+                response = self._handle(request, answers)
+            except Exception as err:
+                self.stats["errors"] += 1
+                response = {"ok": False, "error": str(err)}
+            if isinstance(request, dict) and "id" in request:
+                response["id"] = request["id"]
+            latency = time.perf_counter() - arrived
+            self.stats["requests"] += 1
+            self.stats["total_latency"] += latency
+            self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+            if not reply.done():
+                reply.set_result(response)
+
+    def _handle(self, request: dict, answers: dict) -> dict:
+        op = request["op"]
+        if op == "append":
+            self.agenda.append(appt_io.parse_appt(request["appt"]))
+            answers.clear()
+            return {"ok": True}
+        if op == "remove":
+            self.agenda.remove_exact(appt_io.parse_appt(request["appt"]))
+            answers.clear()
+            return {"ok": True}
+        if op == "conflicts":
+            if "conflicts" not in answers:
+                found = self.agenda.current_conflicts()
+                found.sort()
+                answers["conflicts"] = [str(conflict) for conflict in found]
+            return {"ok": True, "conflicts": answers["conflicts"]}
+        if op == "between":
+            key = ("between", request["start"], request["finish"])
+            if key not in answers:
+                view = self.agenda.between(datetime.fromisoformat(request["start"]),
+                                           datetime.fromisoformat(request["finish"]))
+                answers[key] = [str(appoint) for appoint in view]
+            return {"ok": True, "appts": answers[key]}
+        if op == "stats":
+            return {"ok": True, "stats": self.report()}
+        raise ValueError(f"Unknown op '{op}'")
+
+    def report(self) -> dict:
+        """Counters, plus throughput and mean latency derived from them"""
+        report = dict(self.stats)
+        uptime = time.perf_counter() - self._started
+        report["appointments"] = len(self.agenda)
+        report["uptime"] = uptime
+        report["throughput"] = self.stats["requests"] / uptime
+        report["mean_latency"] = self.stats["total_latency"] / max(1, self.stats["requests"])
+        report["mean_batch"] = self.stats["requests"] / max(1, self.stats["batches"])
+        return report
+
+
+class AgendaClient:
+    """A connection to an AgendaServer"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._reader = reader
+        self._writer = writer
+
+    @classmethod
+    async def connect(cls, host: str = "127.0.0.1", port: int = 2110) -> 'AgendaClient':
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, op: str, **fields) -> dict:
+        """Send one request and wait for its reply"""
+        fields["op"] = op
+        self._writer.write(json.dumps(fields).encode("utf-8") + b"\n")
+        await self._writer.drain()
+        return json.loads(await self._reader.readline())
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+async def serve(host: str, port: int, paths: List[str]):
+    agenda = appt.Agenda()
+    for path in paths:
+        with open(path) as f:
+            appt_io.read_agenda(f, agenda)
+    server = AgendaServer(agenda)
+    port = await server.start(host, port)
+    print(f"Serving {len(agenda)} appointments on {host}:{port}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve an agenda over a local socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2110)
+    parser.add_argument("agendas", nargs="*", help="Agenda files to load at startup")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.agendas))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmarks for Appt, Agenda, and appt_io.
+
+Generates random agendas (see gen_appts.random_agenda) of the
+requested sizes, overlap and appointment lengths, times the main
+operations on them, and writes the timings as JSON.  Given the JSON
+from an earlier run as a baseline, reports operations that have
+become slower and exits with status 1.
+
+Usage:
+    python3 bench_agenda.py --sizes 1000 10000 --output new.json
+    python3 bench_agenda.py --sizes 1000 10000 --baseline old.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import appt
+import appt_bin
+import appt_io
+import gen_appts
+
+
+def best_time(op: Callable[[], object], repeat: int) -> float:
+    """Shortest of repeat timings of op(), in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        before = time.perf_counter()
+        op()
+        best = min(best, time.perf_counter() - before)
+    return best
+
+
+def bench(size: int, overlap: float, mean_minutes: int, distribution: str,
+          repeat: int, seed: int) -> Dict[str, float]:
+    """Timings in seconds for each operation on one random agenda"""
+    agenda = gen_appts.random_agenda(size, overlap, mean_minutes, distribution, seed)
+    lines = str(agenda).split("\n")
+    timings = {}
+    timings["read_agenda"] = best_time(lambda: appt_io.read_agenda(lines), repeat)
+    # sort and conflicts sort their agenda, so each run gets a fresh one
+    fresh = [appt_io.read_agenda(lines) for _ in range(repeat)]
+    timings["sort"] = best_time(lambda: fresh.pop().sort(), repeat)
+    fresh = [appt_io.read_agenda(lines) for _ in range(repeat)]
+    timings["conflicts"] = best_time(lambda: fresh.pop().conflicts(), repeat)
+    if appt.np is not None:
+        fresh = [appt_io.read_agenda(lines) for _ in range(repeat)]
+        timings["conflicts_bulk"] = best_time(lambda: fresh.pop().conflicts_bulk(), repeat)
+    timings["str"] = best_time(lambda: str(agenda), repeat)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.appt")
+        timings["write_binary"] = best_time(lambda: appt_bin.write_agenda(agenda, path), repeat)
+        timings["read_binary"] = best_time(lambda: appt_bin.read_agenda(path), repeat)
+    return timings
+
+
+def regressions(results: List[dict], baseline: List[dict], tolerance: float) -> List[str]:
+    """Descriptions of operations more than tolerance times slower than baseline"""
+    before = {(r["size"], r["op"]): r["seconds"] for r in baseline}
+    slower = []
+    for r in results:
+        old = before.get((r["size"], r["op"]))
+        if old and r["seconds"] > old * tolerance:
+            slower.append(f"{r['op']} on {r['size']} appointments: "
+                          f"{old:.4f}s -> {r['seconds']:.4f}s ({r['seconds'] / old:.2f}x)")
+    return slower
+
+
+def cli() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark Agenda operations")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000],
+                        help="Numbers of appointments")
+    parser.add_argument("--overlap", type=float, default=1.0,
+                        help="Average number of appointments in progress at once")
+    parser.add_argument("--minutes", type=int, default=60,
+                        help="Average appointment length in minutes")
+    parser.add_argument("--distribution", choices=gen_appts.DISTRIBUTIONS, default="uniform",
+                        help="Distribution of appointment lengths")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Time each operation this many times and keep the best")
+    parser.add_argument("--seed", type=int, default=211)
+    parser.add_argument("--output", type=argparse.FileType("w"), default=sys.stdout,
+                        help="Where to write JSON results")
+    parser.add_argument("--baseline", type=argparse.FileType("r"),
+                        help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="Slowdown relative to baseline that counts as a regression")
+    return parser.parse_args()
+
+
+def main():
+    args = cli()
+    results = []
+    for size in args.sizes:
+        timings = bench(size, args.overlap, args.minutes, args.distribution,
+                        args.repeat, args.seed)
+        for op, seconds in timings.items():
+            results.append({"size": size, "op": op, "seconds": seconds})
+        if "conflicts_bulk" in timings:
+            print(f"conflicts_bulk on {size} appointments: "
+                  f"{timings['conflicts'] / timings['conflicts_bulk']:.2f}x as fast as conflicts",
+                  file=sys.stderr)
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "params": {"overlap": args.overlap, "minutes": args.minutes,
+                   "distribution": args.distribution, "repeat": args.repeat,
+                   "seed": args.seed},
+        "results": results,
+    }
+    json.dump(report, args.output, indent=2)
+    args.output.write("\n")
+    if args.baseline:
+        slower = regressions(results, json.load(args.baseline)["results"], args.tolerance)
+        for line in slower:
+            print(f"*** Regression: {line}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
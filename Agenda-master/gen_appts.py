@@ -1,12 +1,19 @@
 """
 Appointment file generator, used for generating larger test cases.
 
-Usage:  TODO
+Usage:
+    python3 gen_appts.py                  # 5000 hourly sample appointments
+    python3 gen_appts.py 10000 3.0 45     # 10000 random appointments, about 3
+                                          # at a time, 45 minutes long on average
 """
 
 import appt
 import appt_io
 import datetime
+import random
+import sys
+
+DISTRIBUTIONS = ["fixed", "uniform", "exponential"]
 
 
 def repeat(first: str, hours_between: int, repetitions: int) -> appt.Agenda:
@@ -24,10 +31,51 @@ def repeat(first: str, hours_between: int, repetitions: int) -> appt.Agenda:
     return agenda
 
 
+def random_agenda(count: int, overlap: float = 1.0, mean_minutes: int = 60,
+                  distribution: str = "uniform", seed: int = 211,
+                  first_day: datetime.datetime = datetime.datetime(2018, 11, 20)) -> appt.Agenda:
+    """An agenda of count appointments at random times, in no
+    particular order.  Start times are spread over enough days
+    that on average overlap appointments are in progress at once
+    (giving about overlap conflicts per appointment).  Lengths in
+    minutes are drawn from distribution (one of DISTRIBUTIONS)
+    with mean mean_minutes.  Each appointment falls within a day.
+    The same seed always gives the same agenda.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {DISTRIBUTIONS}")
+    rand = random.Random(seed)
+    span_minutes = max(1, int(count * mean_minutes / overlap))
+    day = 24 * 60
+    agenda = appt.Agenda()
+    for i in range(count):
+        if distribution == "fixed":
+            minutes = mean_minutes
+        elif distribution == "uniform":
+            minutes = rand.randint(1, 2 * mean_minutes - 1)
+        else:
+            minutes = round(rand.expovariate(1 / mean_minutes))
+        minutes = min(max(minutes, 1), day - 1)
+        offset = rand.randrange(span_minutes)
+        # Slide back if needed to finish by midnight
+        offset = min(offset, offset - offset % day + day - 1 - minutes)
+        start = first_day + datetime.timedelta(minutes=offset)
+        agenda.append(appt.Appt(start, start + datetime.timedelta(minutes=minutes),
+                                f"Random appt #{i}"))
+    return agenda
+
+
 def sample():
     agenda = repeat("2018-11-20 08:00 08:59 | Sample appt", 1, 5000)
     for mtg in agenda:
         print(mtg)
 
 
-sample()
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+        overlap = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+        mean_minutes = int(sys.argv[3]) if len(sys.argv) > 3 else 60
+        print(random_agenda(count, overlap, mean_minutes))
+    else:
+        sample()
@@ -1,6 +1,9 @@
 import unittest
 import time
-from appt_io import parse_appt, parse_agenda, read_agenda
+from datetime import datetime, timedelta
+import appt
+import gen_appts
+from appt_io import parse_appt, parse_agenda, read_agenda, iter_appts
 import logging
 logging.basicConfig()
 log = logging.getLogger(__name__)
@@ -49,6 +52,19 @@ class TestAgendaInOut(unittest.TestCase):
         show_diff(out, self.example)
         self.assertEqual(crush(self.example), crush(out))
 
+    def test03_fixed_width(self):
+        """The fixed-width fast path agrees with the general parser"""
+        exact = parse_appt("2019-01-25 09:05 11:00 | sample ")
+        loose = parse_appt("2019-1-25   9:05 11:00 | sample ")
+        self.assertEqual(exact, loose)
+        self.assertEqual(exact.desc, loose.desc)
+        for bad in ["2019-02-30 10:00 11:00 | no such day",
+                    "2019-01-25 10:00 11:60 | no such minute",
+                    "2019-01-25 10:00 11:00 | too | many | bars",
+                    "2019-01-25 1O:00 11:00 | letter O"]:
+            with self.assertRaises(ValueError):
+                parse_appt(bad)
+
 
 class TestAgendaConflicts(unittest.TestCase):
     """Can we test for conflicts?  Can we do it quickly?"""
@@ -108,6 +124,259 @@ class TestAgendaConflicts(unittest.TestCase):
         oops.sort()
         self.assertEqual(oops, expected_conflicts)
 
+    def test_3_overlapping(self):
+        """Which appointments overlap a proposed booking?"""
+        booking = parse_appt("2018-01-01 10:00 11:00 | proposed")
+        found = self.small.overlapping(booking)
+        self.assertEqual(str(found), str(parse_agenda("""
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 10:15 11:20 | coffee
+        """)))
+        late = parse_appt("2018-01-01 12:00 13:00 | after waking")
+        self.assertEqual(len(self.small.overlapping(late)), 0)
+
+    @unittest.skipIf(appt.np is None, "NumPy is not installed")
+    def test_4_bulk(self):
+        """conflicts_bulk gives exactly what conflicts gives"""
+        for agenda in [self.small, self.big]:
+            self.assertEqual(str(agenda.conflicts_bulk()), str(agenda.conflicts()))
+        with open("test_data/thousand2.txt") as oopsy_file:
+            lines = oopsy_file.readlines()
+        self.assertEqual(str(read_agenda(lines).conflicts_bulk()),
+                         str(read_agenda(lines).conflicts()))
+
+    def test_5_streaming(self):
+        """Conflicts from a sorted stream, without building an Agenda"""
+        with open("test_data/thousand2.txt") as oopsy_file:
+            lines = oopsy_file.readlines()
+        agenda = read_agenda(lines)
+        agenda.sort()
+        sorted_lines = str(agenda).split("\n")
+        streamed = [crush(str(conflict))
+                    for conflict in appt.iter_conflicts(iter_appts(sorted_lines))]
+        expected = [crush(str(conflict)) for conflict in agenda.conflicts().elements]
+        self.assertEqual(sorted(streamed), sorted(expected))
+        with self.assertRaises(ValueError):
+            list(appt.iter_conflicts(iter_appts(reversed(sorted_lines))))
+
+    def test_6_random_agenda(self):
+        """Generated workloads are repeatable, fit within a day,
+        and have about the requested overlap
+        """
+        agenda = gen_appts.random_agenda(2000, overlap=3.0, mean_minutes=90,
+                                         distribution="exponential", seed=5)
+        self.assertEqual(str(agenda), str(gen_appts.random_agenda(
+            2000, overlap=3.0, mean_minutes=90, distribution="exponential", seed=5)))
+        for appoint in agenda:
+            self.assertEqual(appoint.start.date(), appoint.finish.date())
+        self.assertAlmostEqual(len(agenda.conflicts()) / len(agenda), 3.0, delta=0.5)
+
+    def test_7_clusters(self):
+        """One cluster per group of overlapping appointments"""
+        agenda = parse_agenda("""
+        2018-01-01 09:00 12:00 | all morning
+        2018-01-01 09:30 10:00 | a
+        2018-01-01 09:45 10:15 | b
+        2018-01-01 11:00 11:30 | c
+        2018-01-01 12:00 13:00 | lunch
+        2018-01-01 14:00 15:00 | d
+        2018-01-01 14:30 16:00 | e
+        """)
+        clusters = agenda.conflict_clusters()
+        self.assertEqual([str(cluster) for cluster in clusters], [
+            "2018-01-01 09:00 12:00 | 4 appointments, at most 3 at once",
+            "2018-01-01 14:00 16:00 | 2 appointments, at most 2 at once"])
+        self.assertEqual(len(self.big.conflict_clusters()), 0)
+        with open("test_data/thousand2.txt") as oopsy_file:
+            oopsy = read_agenda(oopsy_file)
+        self.assertEqual([(len(c), c.peak) for c in oopsy.conflict_clusters()], [(5, 2), (3, 2)])
+
+    def test_8_concurrency(self):
+        agenda = parse_agenda("""
+        2018-01-01 09:00 12:00 | all morning
+        2018-01-01 09:30 10:00 | a
+        2018-01-01 09:45 10:15 | b
+        2018-01-01 11:00 11:30 | c
+        2018-01-01 14:00 15:00 | d
+        2018-01-02 01:00 03:00 | e
+        """)
+        profile = agenda.concurrency_profile(timedelta(hours=1))
+        self.assertEqual(profile.origin, datetime(2018, 1, 1))
+        self.assertEqual(profile.peak, 3)
+        self.assertEqual(len(profile), 27)
+        self.assertEqual(list(profile.counts[8:16]), [0, 3, 2, 2, 0, 0, 1, 0])
+        self.assertEqual(list(profile.counts[24:]), [0, 1, 1])
+        daily = agenda.concurrency_profile(timedelta(days=1))
+        self.assertEqual(list(daily.counts), [3, 1])
+        self.assertEqual(self.big.concurrency_profile(timedelta(minutes=30)).peak, 1)
+        self.assertEqual(parse_agenda("").concurrency_profile(timedelta(hours=1)).peak, 0)
+
+    def test_9_changed_elements(self):
+        """conflicts() sees elements changed in place, and queries
+        see a new list assigned to elements
+        """
+        agenda = parse_agenda("""
+        2018-01-01 09:00 10:00 | a
+        2018-01-01 11:00 12:00 | b
+        """)
+        self.assertEqual(len(agenda.conflicts()), 0)
+        agenda.elements[1] = parse_appt("2018-01-01 09:30 10:30 | c")
+        self.assertEqual(len(agenda.conflicts()), 1)
+        agenda.elements = [parse_appt("2018-01-01 13:00 14:00 | d"),
+                           parse_appt("2018-01-01 13:30 14:30 | e")]
+        lunch = parse_appt("2018-01-01 13:15 13:45 | lunch")
+        self.assertEqual(len(agenda.overlapping(lunch)), 2)
+        self.assertEqual(len(agenda.conflicts()), 1)
+
+
+class TestAgendaQueries(unittest.TestCase):
+    """Time-range queries with between and at"""
+
+    def setUp(self):
+        self.agenda = parse_agenda("""
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 11:30 12:00 | waking
+        2018-01-01 10:15 11:20 | coffee
+        2018-01-02 10:15 11:20 | coffee again
+        """)
+
+    def test_0_between(self):
+        morning = self.agenda.between(datetime(2018, 1, 1, 10), datetime(2018, 1, 1, 11, 30))
+        self.assertEqual(crush(str(morning)), crush("""
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 10:15 11:20 | coffee
+        """))
+        self.assertEqual(morning[-1].desc, " coffee")
+        self.assertEqual(len(self.agenda.between(datetime(2018, 1, 3), datetime(2018, 1, 4))), 0)
+
+    def test_1_at(self):
+        self.assertEqual([appt.desc for appt in self.agenda.at(datetime(2018, 1, 1, 10, 15))],
+                         [" drowsy", " coffee"])
+        self.assertEqual(len(self.agenda.at(datetime(2018, 1, 1, 10, 30))), 1)
+        self.assertEqual(len(self.agenda.at(datetime(2018, 1, 1, 12, 0))), 0)
+
+    def test_2_live_view(self):
+        """Views follow appends and removes"""
+        day = self.agenda.between(datetime(2018, 1, 2), datetime(2018, 1, 3))
+        self.assertEqual(len(day), 1)
+        lunch = parse_appt("2018-01-02 12:00 13:00 | lunch")
+        self.agenda.append(lunch)
+        self.assertEqual([appt.desc for appt in day], [" coffee again", " lunch"])
+        self.agenda.remove(lunch)
+        self.assertEqual(len(day), 1)
+
+    def test_3_big(self):
+        """Same as a linear scan, on a larger agenda"""
+        with open("test_data/thousand2.txt") as f:
+            agenda = read_agenda(f)
+        period = parse_appt("2018-12-02 02:45 07:10 | query")
+        found = agenda.between(period.start, period.finish)
+        self.assertEqual([str(a) for a in found],
+                         [str(a) for a in sorted(agenda, key=lambda a: a.start)
+                          if a.overlaps(period)])
+
+    def test_4_free_slots(self):
+        slots = self.agenda.free_slots(datetime(2018, 1, 1, 8), datetime(2018, 1, 1, 13),
+                                       timedelta(minutes=30))
+        self.assertEqual(crush(str(slots)), crush("""
+        2018-01-01 08:00 09:15 | free
+        2018-01-01 12:00 13:00 | free
+        """))
+        everything = self.agenda.free_slots(datetime(2018, 1, 1, 8), datetime(2018, 1, 1, 13))
+        self.assertEqual(len(everything), 3)
+
+    def test_5_common_free_slots(self):
+        other = parse_agenda("""
+        2018-01-01 08:00 08:45 | standup
+        2018-01-01 12:30 13:30 | lunch
+        """)
+        slots = appt.common_free_slots([self.agenda, other],
+                                       datetime(2018, 1, 1, 8), datetime(2018, 1, 1, 14),
+                                       timedelta(minutes=20))
+        self.assertEqual(crush(str(slots)), crush("""
+        2018-01-01 08:45 09:15 | free
+        2018-01-01 12:00 12:30 | free
+        2018-01-01 13:30 14:00 | free
+        """))
+
+    def test_6_multi_day(self):
+        """Queries handle appointments spanning several days as they are"""
+        rota = parse_agenda("""
+        2019-01-01 18:00 2019-01-03 09:00 | on call A
+        2019-01-03 08:00 2019-01-05 09:00 | on call B
+        2019-01-02 10:00 11:00 | dentist
+        """)
+        self.assertEqual(crush(str(rota.conflicts())), crush("""
+        2019-01-02 10:00 11:00 | on call A and dentist
+        2019-01-03 08:00 09:00 | on call A and on call B
+        """))
+        self.assertEqual([appt.desc for appt in rota.between(datetime(2019, 1, 4),
+                                                               datetime(2019, 1, 5))],
+                         [" on call B"])
+        self.assertEqual(len(rota.at(datetime(2019, 1, 2, 10, 30))), 2)
+        slots = rota.free_slots(datetime(2018, 12, 31), datetime(2019, 1, 6), timedelta(hours=1))
+        self.assertEqual(crush(str(slots)), crush("""
+        2018-12-31 00:00 2019-01-01 18:00 | free
+        2019-01-05 09:00 2019-01-06 00:00 | free
+        """))
+
+
+class TestIncrementalConflicts(unittest.TestCase):
+    """Conflicts maintained by append and remove"""
+
+    def setUp(self):
+        self.agenda = parse_agenda("""
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 11:30 12:00 | waking
+        """)
+        self.agenda.track_conflicts()
+
+    def test_0_append(self):
+        self.assertEqual(len(self.agenda.current_conflicts()), 0)
+        self.agenda.append(parse_appt("2018-01-01 10:15 11:45 | coffee"))
+        conflicts = self.agenda.current_conflicts()
+        conflicts.sort()
+        self.assertEqual(crush(str(conflicts)), crush("""
+        2018-01-01 10:15 10:30 | drowsy and coffee
+        2018-01-01 11:30 11:45 | coffee and waking
+        """))
+
+    def test_1_remove(self):
+        coffee = parse_appt("2018-01-01 10:15 11:45 | coffee")
+        self.agenda.append(coffee)
+        self.agenda.remove(coffee)
+        self.assertEqual(len(self.agenda), 2)
+        self.assertEqual(len(self.agenda.current_conflicts()), 0)
+        with self.assertRaises(ValueError):
+            self.agenda.remove(coffee)
+
+    def test_2_matches_conflicts(self):
+        """After many appends and removes, same as recomputing"""
+        big = open("test_data/thousand2.txt")
+        appts = read_agenda(big).elements
+        big.close()
+        for appt in appts:
+            self.agenda.append(appt)
+        for appt in appts[::7]:
+            self.agenda.remove(appt)
+        tracked = self.agenda.current_conflicts()
+        tracked.sort()
+        expected = self.agenda.conflicts()
+        expected.sort()
+        self.assertEqual(str(tracked), str(expected))
+
+    def test_3_same_appt_twice(self):
+        """One Appt appended twice is two appointments"""
+        coffee = parse_appt("2018-01-01 10:15 11:45 | coffee")
+        self.agenda.append(coffee)
+        self.agenda.append(coffee)
+        self.assertEqual(len(self.agenda.current_conflicts()), len(self.agenda.conflicts()))
+        self.assertEqual(len(self.agenda.current_conflicts()), 5)
+        self.agenda.remove(coffee)
+        self.assertEqual(len(self.agenda.current_conflicts()), 2)
+        self.agenda.remove(coffee)
+        self.assertEqual(len(self.agenda.current_conflicts()), 0)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,8 @@
 import unittest
 import time
+from datetime import datetime, timedelta
+from appt import Appt, Agenda
+import appt_io
 from appt_io import parse_appt, parse_agenda, read_agenda
 import logging
 logging.basicConfig()
@@ -48,5 +51,78 @@ class TestAppt(unittest.TestCase):
         self.assertEqual(self.coffee, self.coffee_same)
         self.assertEqual(self.brunch, self.brunch_same)
 
+    def test_04_frozen(self):
+        frozen = self.coffee.freeze()
+        self.assertEqual(frozen, self.coffee.freeze())
+        self.assertNotEqual(frozen, self.coffee_same.freeze())
+        self.assertEqual(len({frozen, self.coffee.freeze(), self.brunch.freeze()}), 2)
+        self.assertEqual(str(frozen), str(self.coffee))
+        self.assertEqual(frozen.finish_minutes - frozen.start_minutes, 120)
+        with self.assertRaises(AttributeError):
+            frozen.desc = "Tea with neighbors"
+        self.assertEqual(frozen.thaw(), self.coffee)
+
+    def test_05_frozen_order(self):
+        coffee, brunch = self.coffee.freeze(), self.brunch.freeze()
+        more_coffee = self.more_coffee.freeze()
+        self.assertTrue(coffee < more_coffee)
+        self.assertTrue(more_coffee > coffee)
+        self.assertTrue(coffee.overlaps(brunch))
+        self.assertFalse(brunch.overlaps(more_coffee))
+        self.assertEqual(coffee.intersect(brunch).thaw(),
+                         parse_appt("2019-01-01 09:00 10:00 | Title doesn't matter"))
+
+    def test_06_deduplicate(self):
+        agenda = parse_agenda("""
+        2019-01-01 08:00 10:00 | Coffee with neighbors
+        2019-01-01 09:00 13:00 | Brunch with neighbors
+        2019-01-01 08:00 10:00 | Coffee with neighbors
+        2019-01-01 08:00 10:00 | Coffee with someone else
+        """)
+        self.assertEqual(agenda.deduplicate(), 1)
+        self.assertEqual(len(agenda), 3)
+        self.assertEqual(len(agenda.conflicts()), 3)
+
+    def test_07_multi_day(self):
+        """Appointments that end on a later day print and parse as such"""
+        shift = parse_appt("2019-01-01 22:00 2019-01-03 06:00 | On call")
+        self.assertEqual(str(shift), "2019-01-01 22:00 2019-01-03 06:00 |  On call")
+        self.assertEqual(parse_appt(str(shift)), shift)
+        self.assertEqual(parse_appt("2019-1-1 22:00   2019-01-03 6:00 | On call"), shift)
+        self.assertTrue(shift.overlaps(parse_appt("2019-01-02 12:00 13:00 | Lunch")))
+        self.assertEqual(str(shift.intersect(parse_appt("2019-01-02 23:00 2019-01-04 01:00 | x"))),
+                         "2019-01-02 23:00 2019-01-03 06:00 |  On call and  x")
+        midnight = parse_appt("2019-01-01 22:00 2019-01-02 00:00 | Late")
+        self.assertEqual(parse_appt(str(midnight)), midnight)
+
+    def test_08_frozen_seconds(self):
+        """Seconds count:  frozen copies of appointments that differ
+        only in seconds are different, and short ones can be frozen
+        """
+        nine = datetime(2019, 1, 1, 9, 0)
+        early = Appt(nine, nine + timedelta(hours=1), "Coffee")
+        late = Appt(nine + timedelta(seconds=30), nine + timedelta(hours=1), "Coffee")
+        blink = Appt(nine, nine + timedelta(seconds=30), "Coffee")
+        self.assertNotEqual(early.freeze(), late.freeze())
+        self.assertTrue(blink.freeze() < late.freeze())
+        self.assertFalse(blink.freeze().overlaps(late.freeze()))
+        self.assertTrue(blink.freeze().overlaps(early.freeze()))
+        agenda = Agenda()
+        for appoint in [early, late, blink, early]:
+            agenda.append(appoint)
+        self.assertEqual(agenda.deduplicate(), 1)
+        self.assertEqual(len(agenda), 3)
+
+    def test_09_fixed_width_multi_day(self):
+        """Both layouts Appt.__str__ writes take the fast path"""
+        night = appt_io._parse_fixed_width("2018-05-03 22:00 2018-05-04 06:00 | Night shift")
+        self.assertIsNotNone(night)
+        self.assertEqual((night.start, night.finish, night.desc),
+                         (datetime(2018, 5, 3, 22, 0), datetime(2018, 5, 4, 6, 0), " Night shift"))
+        study = appt_io._parse_fixed_width("2018-05-03 15:40 16:15 | Study hard")
+        self.assertIsNotNone(study)
+        self.assertEqual(study.finish, datetime(2018, 5, 3, 16, 15))
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,82 @@
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+from appt_io import read_agenda, parse_appt
+import appt_bin
+
+
+class TestBinaryAgenda(unittest.TestCase):
+    """Round trips through the binary format, and mapped queries"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "thousand2.appt")
+        with open("test_data/thousand2.txt") as f:
+            self.lines = f.readlines()
+        with open("test_data/thousand2.txt") as f:
+            appt_bin.text_to_binary(f, self.path)
+        self.agenda = read_agenda(self.lines)
+        self.agenda.sort()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_00_round_trip(self):
+        self.assertEqual(str(appt_bin.read_agenda(self.path)), str(self.agenda))
+        text = io.StringIO()
+        appt_bin.binary_to_text(self.path, text)
+        self.assertEqual(text.getvalue(), str(self.agenda) + "\n")
+
+    def test_01_random_access(self):
+        with appt_bin.MappedAgenda(self.path) as mapped:
+            self.assertEqual(len(mapped), len(self.agenda))
+            self.assertEqual(str(mapped[17]), str(self.agenda.elements[17]))
+            self.assertEqual(str(mapped[-1]), str(self.agenda.elements[-1]))
+            with self.assertRaises(IndexError):
+                mapped[len(mapped)]
+
+    def test_02_between(self):
+        start, finish = datetime(2018, 12, 2, 2, 45), datetime(2018, 12, 2, 5, 0)
+        period = parse_appt("2018-12-02 02:45 05:00 | query")
+        expected = [str(a) for a in self.agenda if a.overlaps(period)]
+        with appt_bin.MappedAgenda(self.path) as mapped:
+            self.assertEqual([str(a) for a in mapped.between(start, finish)], expected)
+
+    def test_03_not_binary(self):
+        with self.assertRaises(ValueError):
+            appt_bin.MappedAgenda("test_data/cis211.txt")
+
+    def test_04_multi_day(self):
+        """Long appointments found by queries that begin after they do"""
+        path = os.path.join(self.tmp.name, "rota.appt")
+        rota = ["2019-01-01 18:00 2019-01-09 09:00 | on call",
+                "2019-01-05 10:00 11:00 | dentist"]
+        appt_bin.text_to_binary(rota, path)
+        with appt_bin.MappedAgenda(path) as mapped:
+            self.assertEqual([str(a) for a in mapped],
+                             [str(parse_appt(line)) for line in rota])
+            self.assertEqual(len(mapped.between(datetime(2019, 1, 5, 10, 30),
+                                                datetime(2019, 1, 5, 12))), 2)
+
+    def test_05_long_appointment_no_scan(self):
+        """One very long appointment does not make queries scan every record"""
+        path = os.path.join(self.tmp.name, "on_call.appt")
+        lines = self.lines + ["2018-01-01 00:00 2019-12-31 00:00 | on call\n"]
+        appt_bin.text_to_binary(lines, path)
+        agenda = read_agenda(lines)
+        agenda.sort()
+        period = parse_appt("2018-12-02 02:45 05:00 | query")
+        expected = [str(a) for a in agenda if a.overlaps(period)]
+        with appt_bin.MappedAgenda(path) as mapped:
+            with mock.patch.object(mapped, "_finish", wraps=mapped._finish) as finish:
+                found = mapped.between(period.start, period.finish)
+            self.assertEqual([str(a) for a in found], expected)
+            self.assertLessEqual(finish.call_count, 3 * 64)
+            self.assertEqual(mapped.between(datetime(2017, 1, 1), datetime(2017, 1, 2)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
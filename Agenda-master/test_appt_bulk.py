@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from appt_io import read_agenda
+from appt_bulk import load_agendas
+
+
+class TestLoadAgendas(unittest.TestCase):
+    """Parallel loading matches reading the files one at a time"""
+
+    def setUp(self):
+        self.paths = ["test_data/cis211.txt", "test_data/thousand.txt",
+                      "test_data/thousand2.txt"]
+        self.expected = read_agenda([])
+        self.serial_conflicts = {}
+        for path in self.paths:
+            with open(path) as f:
+                agenda = read_agenda(f)
+            for appoint in agenda.elements:
+                self.expected.append(appoint)
+            self.serial_conflicts[path] = agenda.conflicts()
+        self.expected.sort()
+
+    def check(self, chunk_bytes: int):
+        agenda, reports = load_agendas(self.paths, max_workers=2, chunk_bytes=chunk_bytes)
+        self.assertEqual(str(agenda), str(self.expected))
+        self.assertEqual(sorted(reports), sorted(self.paths))
+        for path in self.paths:
+            self.assertEqual(str(reports[path]), str(self.serial_conflicts[path]))
+
+    def test_00_whole_files(self):
+        self.check(chunk_bytes=1 << 20)
+
+    def test_01_chunked(self):
+        """Byte ranges that split lines anywhere"""
+        self.check(chunk_bytes=997)
+
+    def test_02_bad_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bad = os.path.join(tmp, "bad.txt")
+            with open(bad, "w") as f:
+                f.write("2019-01-08 10:00 | no finish time\n")
+            with self.assertRaises(ValueError):
+                load_agendas([bad], max_workers=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from unittest import mock
+from appt_io import parse_appt, parse_agenda, read_agenda
+from appt_columnar import ColumnarAgenda
+
+
+class TestColumnarAgenda(unittest.TestCase):
+    """ColumnarAgenda should behave like Agenda"""
+
+    def setUp(self):
+        self.text = """
+        2018-01-01 11:30 12:00 | waking
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 10:15 11:20 | coffee
+        2018-01-02 10:15 11:20 | coffee
+        """
+
+    def test_00_inout(self):
+        columns = read_agenda(self.text.split("\n"), ColumnarAgenda())
+        self.assertEqual(len(columns), 4)
+        self.assertEqual(str(columns), str(parse_agenda(self.text)))
+        self.assertEqual(columns[2], parse_appt("2018-01-01 10:15 11:20 | coffee"))
+        self.assertEqual(columns[3].desc, " coffee")
+
+    def test_01_interned(self):
+        columns = read_agenda(self.text.split("\n"), ColumnarAgenda())
+        self.assertIs(columns[2].desc, columns[3].desc)
+
+    def test_02_conflicts(self):
+        """Same conflicts, in the same order, as Agenda"""
+        for path in ["test_data/thousand.txt", "test_data/thousand2.txt"]:
+            with open(path) as f:
+                lines = f.readlines()
+            columns = read_agenda(lines, ColumnarAgenda())
+            agenda = read_agenda(lines)
+            self.assertEqual(str(columns.conflicts()), str(agenda.conflicts()))
+            self.assertEqual(str(columns), str(agenda))
+
+    def test_03_iter_sorted(self):
+        """In start order, made one at a time, leaving the columns alone"""
+        columns = read_agenda(self.text.split("\n"), ColumnarAgenda())
+        agenda = parse_agenda(self.text)
+        agenda.sort()
+        made = []
+        getitem = ColumnarAgenda.__getitem__
+        with mock.patch.object(ColumnarAgenda, "__getitem__",
+                               lambda self, i: made.append(i) or getitem(self, i)):
+            appts = columns.iter_sorted()
+            self.assertEqual(str(next(appts)), str(agenda.elements[0]))
+            self.assertEqual(made, [1])
+            self.assertEqual("\n".join(str(appt) for appt in appts),
+                             "\n".join(str(appt) for appt in agenda.elements[1:]))
+        self.assertEqual(str(columns[0]), str(parse_appt("2018-01-01 11:30 12:00 | waking")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from appt_io import parse_agenda, iter_appts
+from appt_columnar import ColumnarAgenda
+from appt_diff import diff, merge3
+from test_agenda import crush
+
+
+class TestDiff(unittest.TestCase):
+    """Sort-merge diff and three-way merge"""
+
+    def setUp(self):
+        self.base = """
+        2019-01-08 10:00 11:20 | lecture 1
+        2019-01-10 10:00 11:20 | lecture 2
+        2019-01-15 10:00 11:20 | lecture 3
+        2019-01-17 10:00 11:20 | lecture 4
+        """
+        self.ours = """
+        2019-01-08 10:00 11:20 | lecture 1
+        2019-01-10 10:00 11:20 | lecture 2 (room change)
+        2019-01-15 10:00 11:20 | lecture 3
+        2019-01-17 10:00 11:20 | lecture 4
+        2019-01-17 13:00 14:00 | office hours
+        """
+        self.theirs = """
+        2019-01-08 10:00 11:20 | lecture 1
+        2019-01-10 10:00 11:20 | lecture 2
+        2019-01-17 10:00 11:20 | lecture 4 (guest speaker)
+        2019-01-16 10:00 11:20 | lecture 3
+        """
+
+    def test_00_diff(self):
+        changes = [(kind, str(old), str(new))
+                   for kind, old, new in diff(parse_agenda(self.base), parse_agenda(self.theirs))]
+        self.assertEqual([(kind, crush(old), crush(new)) for kind, old, new in changes], [
+            ("removed", crush("2019-01-15 10:00 11:20 | lecture 3"), "None"),
+            ("added", "None", crush("2019-01-16 10:00 11:20 | lecture 3")),
+            ("changed", crush("2019-01-17 10:00 11:20 | lecture 4"),
+             crush("2019-01-17 10:00 11:20 | lecture 4 (guest speaker)"))])
+        self.assertEqual(list(diff(parse_agenda(self.base), parse_agenda(self.base))), [])
+
+    def test_01_streams(self):
+        """Sorted streams and columnar agendas work too"""
+        columns = ColumnarAgenda()
+        for appoint in iter_appts(self.ours.split("\n")):
+            columns.append(appoint)
+        kinds = [kind for kind, _, _ in diff(iter_appts(self.base.split("\n")), columns)]
+        self.assertEqual(kinds, ["changed", "added"])
+        with self.assertRaises(ValueError):
+            list(diff(iter_appts(self.theirs.split("\n")), []))
+
+    def test_02_merge3(self):
+        conflicts = []
+        merged = parse_agenda("")
+        for appoint in merge3(parse_agenda(self.base), parse_agenda(self.ours),
+                              parse_agenda(self.theirs), conflicts):
+            merged.append(appoint)
+        self.assertEqual(crush(str(merged)), crush("""
+        2019-01-08 10:00 11:20 | lecture 1
+        2019-01-10 10:00 11:20 | lecture 2 (room change)
+        2019-01-16 10:00 11:20 | lecture 3
+        2019-01-17 10:00 11:20 | lecture 4 (guest speaker)
+        2019-01-17 13:00 14:00 | office hours
+        """))
+        self.assertEqual(conflicts, [])
+
+    def test_03_merge_conflict(self):
+        conflicts = []
+        rival = self.base.replace("lecture 1", "exam")
+        ours = self.base.replace("lecture 1", "quiz")
+        merged = list(merge3(parse_agenda(self.base), parse_agenda(ours),
+                             parse_agenda(rival), conflicts))
+        self.assertEqual(len(merged), 4)
+        self.assertEqual(merged[0].desc, " quiz")
+        self.assertEqual(len(conflicts), 1)
+        self.assertEqual((conflicts[0].ours, conflicts[0].theirs), ([" quiz"], [" exam"]))
+
+    def test_04_leaves_inputs_alone(self):
+        """Unsorted agendas are compared without being reordered"""
+        theirs = parse_agenda(self.theirs)
+        compact = ColumnarAgenda()
+        for appoint in parse_agenda(self.theirs):
+            compact.append(appoint)
+        before = str(theirs)
+        list(diff(parse_agenda(self.base), theirs))
+        list(diff(parse_agenda(self.base), compact))
+        self.assertEqual(str(theirs), before)
+        self.assertEqual(crush(str(compact)), crush(before))
+
+
+if __name__ == "__main__":
+    unittest.main()
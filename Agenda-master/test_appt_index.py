@@ -0,0 +1,96 @@
+import unittest
+import random
+from datetime import datetime, timedelta
+from appt import Appt
+from appt_index import IntervalIndex
+
+
+def random_appts(n: int, seed: int) -> list:
+    """n appointments of random length packed into a few days,
+    so that many of them overlap.
+    """
+    rand = random.Random(seed)
+    base = datetime(2019, 1, 1)
+    appts = []
+    for i in range(n):
+        start = base + timedelta(minutes=15 * rand.randrange(300))
+        finish = start + timedelta(minutes=15 * rand.randrange(1, 12))
+        appts.append(Appt(start, finish, f"appt {i}"))
+    return appts
+
+
+class TestIntervalIndex(unittest.TestCase):
+    """Compare index queries against brute force scans"""
+
+    def setUp(self):
+        self.appts = random_appts(400, seed=211)
+        self.index = IntervalIndex(self.appts)
+        self.in_order = sorted(self.appts, key=lambda appt: appt.start)
+
+    def test_00_overlapping(self):
+        for probe in random_appts(50, seed=5):
+            expected = [a for a in self.in_order if a.overlaps(probe)]
+            self.assertEqual(self.index.overlapping(probe.start, probe.finish), expected)
+
+    def test_01_containing(self):
+        for probe in random_appts(50, seed=6):
+            t = probe.start
+            expected = [a for a in self.in_order if a.start <= t < a.finish]
+            self.assertEqual(self.index.containing(t), expected)
+
+    def test_02_pairs(self):
+        expected = [(a, b) for i, a in enumerate(self.in_order)
+                    for b in self.in_order[i + 1:] if a.overlaps(b)]
+        self.assertEqual(list(self.index.pairs()), expected)
+
+    def test_03_add_remove(self):
+        """Pending and removed items are honored before and after merging"""
+        index = IntervalIndex()
+        for appt in self.appts:
+            index.add(appt)
+        probe = self.appts[0]
+        for appt in self.appts[::3]:
+            index.remove(appt)
+        live = [a for a in self.in_order if not any(a is b for b in self.appts[::3])]
+        self.assertEqual(len(index), len(live))
+        self.assertEqual(index.overlapping(probe.start, probe.finish),
+                         [a for a in live if a.overlaps(probe)])
+        self.assertEqual(list(index), live)
+        with self.assertRaises(ValueError):
+            index.remove(self.appts[0])
+
+    def test_04_window_pending(self):
+        """A window with fresh items in it is answered without merging"""
+        index = IntervalIndex(self.appts)
+        list(index)   # Merge everything
+        probe = self.in_order[len(self.in_order) // 2]
+        new = Appt(probe.start, probe.start + timedelta(minutes=5), "new")
+        index.add(new)
+        before, items, lo, hi = index.window(probe.start, probe.finish)
+        found = before + items[lo:hi]
+        self.assertIn(new, found)
+        expected = sorted(self.in_order + [new], key=lambda appt: appt.start)
+        self.assertEqual(found, [a for a in expected if a.overlaps(probe)])
+        self.assertEqual(index._pending, [new])
+        self.assertEqual(len(index._levels), 1)
+
+    def test_05_bookings(self):
+        """Interleaved queries, appends and removes stay exact,
+        and the levels stay few
+        """
+        index = IntervalIndex()
+        live = []
+        for i, appt in enumerate(random_appts(1200, seed=7)):
+            self.assertEqual(index.overlapping(appt.start, appt.finish),
+                             [a for a in sorted(live, key=lambda a: a.start) if a.overlaps(appt)])
+            index.add(appt)
+            live.append(appt)
+            if i % 5 == 4:
+                index.remove(live.pop(i % len(live)))
+            self.assertLessEqual(len(index._levels), 12)
+        self.assertEqual(len(index), len(live))
+        self.assertEqual(list(index), sorted(live, key=lambda a: a.start))
+
+
+if __name__ == "__main__":
+    unittest.main()
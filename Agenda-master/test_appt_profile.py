@@ -0,0 +1,42 @@
+import json
+import unittest
+import appt
+import appt_io
+import appt_profile
+
+
+class TestProfile(unittest.TestCase):
+    """Counting and timing calls, only while enabled"""
+
+    def setUp(self):
+        appt_profile.reset()
+
+    def tearDown(self):
+        appt_profile.disable()
+
+    def test_00_counts(self):
+        appt_profile.enable()
+        with open("test_data/thousand2.txt") as f:
+            agenda = appt_io.read_agenda(f)
+        conflicts = agenda.conflicts()
+        stats = json.loads(appt_profile.report("json"))
+        self.assertEqual(stats["read_agenda"]["calls"], 1)
+        self.assertEqual(stats["parse_appt"]["calls"], len(agenda))
+        self.assertEqual(stats["Agenda.conflicts"]["calls"], 1)
+        self.assertEqual(stats["Agenda.sort"]["calls"], 1)
+        self.assertEqual(stats["Appt.intersect"]["calls"], len(conflicts))
+        self.assertGreater(stats["read_agenda"]["seconds"], stats["parse_appt"]["seconds"] / 2)
+        self.assertIn("Agenda.conflicts", appt_profile.report())
+
+    def test_01_disable(self):
+        original = appt.Agenda.conflicts
+        appt_profile.enable()
+        self.assertIsNot(appt.Agenda.conflicts, original)
+        appt_profile.disable()
+        self.assertIs(appt.Agenda.conflicts, original)
+        appt_io.parse_appt("2019-01-01 08:00 09:00 | not counted")
+        self.assertEqual(json.loads(appt_profile.report("json"))["parse_appt"]["calls"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
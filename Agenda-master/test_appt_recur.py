@@ -0,0 +1,103 @@
+import unittest
+from datetime import datetime, timedelta
+from appt_io import parse_appt, parse_agenda
+from appt_recur import Recurrence, MONDAY, WEDNESDAY, FRIDAY
+from test_agenda import crush
+
+
+class TestRecurrence(unittest.TestCase):
+    """Lazy expansion of recurring appointments"""
+
+    def setUp(self):
+        # Monday January 7, 2019
+        self.standup = Recurrence(parse_appt("2019-01-07 09:00 09:15 | standup"),
+                                  every=timedelta(days=1))
+        self.class_mwf = Recurrence(parse_appt("2019-01-07 10:00 11:20 | lecture"),
+                                    weekdays=[MONDAY, WEDNESDAY, FRIDAY],
+                                    until=datetime(2019, 3, 16))
+
+    def test_00_window(self):
+        week = list(self.class_mwf.occurrences(datetime(2019, 1, 14), datetime(2019, 1, 21)))
+        self.assertEqual(crush("".join(str(appt) for appt in week)), crush("""
+            2019-01-14 10:00 11:20 | lecture
+            2019-01-16 10:00 11:20 | lecture
+            2019-01-18 10:00 11:20 | lecture
+            """))
+
+    def test_01_far_future(self):
+        """Expanding a window years away creates only its occurrences"""
+        found = list(self.standup.occurrences(datetime(2030, 6, 1, 9, 10), datetime(2030, 6, 2)))
+        self.assertEqual(len(found), 1)
+        self.assertEqual(crush(str(found[0])), crush("2030-06-01 09:00 09:15 | standup"))
+
+    def test_02_bounds(self):
+        self.assertEqual(len(list(self.class_mwf.occurrences())), 30)
+        three = Recurrence(parse_appt("2019-01-07 22:00 23:00 | shift"),
+                           every=timedelta(hours=8), count=3)
+        self.assertEqual(len(list(three.occurrences())), 3)
+
+    def test_03_first_conflict(self):
+        """Conflicts found without expanding the rules in full"""
+        thursday = Recurrence(parse_appt("2019-01-10 09:10 10:00 | review"),
+                              every=timedelta(weeks=2))
+        self.assertEqual(crush(str(self.standup.first_conflict(thursday))),
+                         crush("2019-01-10 09:10 09:15 | standup and review"))
+        afternoons = Recurrence(parse_appt("2019-01-07 13:00 14:00 | office hours"),
+                                weekdays=[MONDAY, FRIDAY])
+        self.assertIsNone(self.standup.first_conflict(afternoons))
+        late = Recurrence(parse_appt("2019-01-08 10:30 12:00 | late"),
+                          every=timedelta(days=5))
+        # Tuesdays, then every fifth day: first meets a lecture on Friday the 18th
+        self.assertEqual(crush(str(late.first_conflict(self.class_mwf))),
+                         crush("2019-01-18 10:30 11:20 | lecture and late"))
+
+    def test_04_agenda_rules(self):
+        agenda = parse_agenda("2019-01-09 09:30 10:30 | dentist")
+        agenda.add_rule(self.standup)
+        agenda.add_rule(self.class_mwf)
+        self.assertEqual(len(agenda), 1)
+        day = agenda.expand(datetime(2019, 1, 9), datetime(2019, 1, 10))
+        self.assertEqual(crush(str(day)), crush("""
+        2019-01-09 09:00 09:15 | standup
+        2019-01-09 09:30 10:30 | dentist
+        2019-01-09 10:00 11:20 | lecture
+        """))
+
+    def test_05_rules_in_queries(self):
+        """Standing appointments show up in range queries and block free slots"""
+        agenda = parse_agenda("2019-01-09 09:30 10:30 | dentist")
+        agenda.add_rule(self.standup)
+        day = agenda.between(datetime(2019, 1, 9), datetime(2019, 1, 10))
+        self.assertEqual(crush(str(day)), crush("""
+        2019-01-09 09:00 09:15 | standup
+        2019-01-09 09:30 10:30 | dentist
+        """))
+        self.assertEqual([appt.desc for appt in agenda.at(datetime(2019, 1, 10, 9, 5))],
+                         [" standup"])
+        slots = agenda.free_slots(datetime(2019, 1, 9, 8), datetime(2019, 1, 9, 11))
+        self.assertEqual(crush(str(slots)), crush("""
+        2019-01-09 08:00 09:00 | free
+        2019-01-09 09:15 09:30 | free
+        2019-01-09 10:30 11:00 | free
+        """))
+        agenda.add_rule(self.class_mwf)
+        self.assertEqual(len(day), 3)
+        self.assertEqual(len(agenda), 1)
+
+    def test_06_rules_in_booking(self):
+        """A booking check sees a standing meeting"""
+        agenda = parse_agenda("2019-01-09 09:30 10:30 | dentist")
+        agenda.add_rule(self.standup)
+        booking = parse_appt("2019-01-09 09:10 09:45 | call")
+        self.assertEqual(crush(str(agenda.overlapping(booking))), crush("""
+        2019-01-09 09:00 09:15 | standup
+        2019-01-09 09:30 10:30 | dentist
+        """))
+        self.assertEqual(len(agenda.conflicts()), 0)
+        agenda.append(booking)
+        week = agenda.expand(datetime(2019, 1, 7), datetime(2019, 1, 14))
+        self.assertEqual(len(week.conflicts()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
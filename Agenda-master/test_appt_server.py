@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+from appt_io import parse_agenda
+from appt_server import AgendaServer, AgendaClient
+from test_agenda import crush
+
+
+class TestAgendaServer(unittest.IsolatedAsyncioTestCase):
+    """Talk to a server on a local port"""
+
+    async def asyncSetUp(self):
+        self.server = AgendaServer(parse_agenda("""
+        2018-01-01 09:15 10:30 | drowsy
+        2018-01-01 11:30 12:00 | waking
+        """))
+        port = await self.server.start(port=0)
+        self.client = await AgendaClient.connect(port=port)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.server.close()
+
+    async def test_00_append_and_conflicts(self):
+        reply = await self.client.request("append", appt="2018-01-01 10:15 11:45 | coffee", id=7)
+        self.assertEqual(reply, {"ok": True, "id": 7})
+        reply = await self.client.request("conflicts")
+        self.assertEqual([crush(c) for c in reply["conflicts"]], [
+            crush("2018-01-01 10:15 10:30 | drowsy and coffee"),
+            crush("2018-01-01 11:30 11:45 | coffee and waking")])
+        reply = await self.client.request("between", start="2018-01-01 11:00",
+                                          finish="2018-01-01 12:00")
+        self.assertEqual(len(reply["appts"]), 2)
+        await self.client.request("remove", appt="2018-01-01 10:15 11:45 | coffee")
+        self.assertEqual((await self.client.request("conflicts"))["conflicts"], [])
+
+    async def test_01_errors(self):
+        reply = await self.client.request("append", appt="not an appointment")
+        self.assertFalse(reply["ok"])
+        reply = await self.client.request("reboot")
+        self.assertFalse(reply["ok"])
+        self.assertEqual(self.server.stats["errors"], 2)
+
+    async def test_02_batching(self):
+        """Many clients at once are served in batches"""
+        port = self.server._server.sockets[0].getsockname()[1]
+        clients = [await AgendaClient.connect(port=port) for _ in range(20)]
+        replies = await asyncio.gather(*[
+            client.request("append", appt=f"2018-01-02 {10 + i % 5}:00 {11 + i % 5}:30 | m{i}")
+            for i, client in enumerate(clients)])
+        self.assertTrue(all(reply["ok"] for reply in replies))
+        replies = await asyncio.gather(*[client.request("conflicts") for client in clients])
+        self.assertEqual(len({len(reply["conflicts"]) for reply in replies}), 1)
+        stats = (await self.client.request("stats"))["stats"]
+        self.assertEqual(stats["appointments"], 22)
+        self.assertEqual(stats["requests"], 40)
+        self.assertLess(stats["batches"], 40)
+        for client in clients:
+            await client.close()
+
+    async def test_03_remove_matches_description(self):
+        """Removing one booking leaves another in the same period"""
+        await self.client.request("append", appt="2018-01-03 10:00 11:00 | dentist")
+        await self.client.request("append", appt="2018-01-03 10:00 11:00 | lunch")
+        reply = await self.client.request("remove", appt="2018-01-03 10:00 11:00 | lunch")
+        self.assertTrue(reply["ok"])
+        reply = await self.client.request("between", start="2018-01-03 00:00",
+                                          finish="2018-01-04 00:00")
+        self.assertEqual([crush(a) for a in reply["appts"]],
+                         [crush("2018-01-03 10:00 11:00 | dentist")])
+        reply = await self.client.request("remove", appt="2018-01-03 10:00 11:00 | lunch")
+        self.assertFalse(reply["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
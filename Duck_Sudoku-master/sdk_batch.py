@@ -0,0 +1,121 @@
+"""
+Solving many Sudoku puzzles at once.
+
+Puzzles come from a directory of .sdk files or from files
+holding many puzzles (see sdk_reader.iter_puzzles).  They are
+spread over a pool of worker processes; each worker builds one
+Board, with its groups, and reuses it for every puzzle it is
+given.  Results come back in input order as they are ready, so
+they can be written out while later puzzles are still being
+solved.  Each result is written as one line,
+    name status solution seconds
+where status is solved, unsolved, or rejected (duplicates), and
+solution is the final board on one line.
+"""
+
+import multiprocessing
+import os
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+import sdk_board
+import sdk_dlx
+import sdk_reader
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
+
+# Solving engines by name; each fills in a board and returns
+# True if it found a solution
+ENGINES: Dict[str, Callable[[sdk_board.Board], bool]] = {
+    "propagate": sdk_board.Board.solve,
+    "dlx": sdk_dlx.solve,
+}
+
+# A puzzle to solve: (name, rows)
+Task = Tuple[str, List[str]]
+# A solved puzzle: (name, status, solution, seconds)
+Result = Tuple[str, str, str, float]
+
+
+def tasks(paths: Iterable[str]) -> Iterator[Task]:
+    """The puzzles in each path, named path:n for the nth
+    puzzle in a file.  A directory contributes each of its .sdk
+    files, in name order.  A file that cannot be read is logged
+    and skipped from the point of the error on.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path))
+                     if name.endswith(".sdk")]
+        else:
+            files = [path]
+        for file in files:
+            try:
+                for n, rows in enumerate(sdk_reader.iter_puzzles(file), start=1):
+                    yield f"{file}:{n}", rows
+            except (sdk_reader.InputError, OSError) as e:
+                log.warning(f"Skipping rest of {file}: {e}")
+
+
+# --------------------------------
+#  In each worker process
+# --------------------------------
+
+_board = None
+_engine = None
+
+
+def _init_worker(engine: str):
+    """Build the board this process will reuse"""
+    global _board, _engine
+    _board = sdk_board.Board()
+    _engine = ENGINES[engine]
+
+
+def _solve(task: Task) -> Result:
+    name, rows = task
+    board = _board
+    start = time.perf_counter()
+    board.set_tiles(rows)
+    if not board.is_consistent():
+        status = "rejected"
+    elif _engine(board) and board.is_complete() and board.is_consistent():
+        status = "solved"
+    else:
+        status = "unsolved"
+    elapsed = time.perf_counter() - start
+    return name, status, "".join(board.as_list()), elapsed
+
+
+def solve_all(puzzles: Iterable[Task], engine: str = "propagate",
+              jobs: int = None, chunksize: int = 64) -> Iterator[Result]:
+    """Solve each puzzle, yielding results in the same order.
+    jobs is the number of worker processes (default: one per CPU);
+    with jobs=1 the puzzles are solved in this process.
+    """
+    if jobs == 1:
+        _init_worker(engine)
+        yield from map(_solve, puzzles)
+        return
+    with multiprocessing.Pool(jobs, initializer=_init_worker,
+                              initargs=(engine,)) as pool:
+        yield from pool.imap(_solve, puzzles, chunksize)
+
+
+def run(paths: Iterable[str], out: TextIO, engine: str = "propagate",
+        jobs: int = None) -> Dict[str, int]:
+    """Solve every puzzle in paths, writing a line for each to out.
+    Returns the number of puzzles with each status.
+    """
+    counts = {"solved": 0, "unsolved": 0, "rejected": 0}
+    start = time.perf_counter()
+    for name, status, solution, seconds in solve_all(tasks(paths), engine, jobs):
+        out.write(f"{name} {status} {solution} {seconds:.6f}\n")
+        counts[status] += 1
+    log.info(f"{sum(counts.values())} puzzles in "
+             f"{time.perf_counter() - start:.3f}s: {counts}")
+    return counts
@@ -17,7 +17,7 @@ the symbol choices
 from sdk_config import CHOICES, UNKNOWN, ROOT
 from sdk_config import NROWS, NCOLS
 import enum
-from typing import List, Sequence, Set
+from typing import Iterable, List, Sequence, Set, Union
 
 import logging
 logging.basicConfig()
@@ -99,6 +99,59 @@ class Listenable:
         for listener in self.listeners:
             listener.notify(event)
 
+
+class EventBatch:
+    """Holds back TileChanged events while open, then sends
+    each changed tile's listeners one event when it closes:
+        with board.events:
+            ...  # tiles change, maybe many times
+    Batches nest; only the outermost close sends events.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        # Tiles owed an event, in the order they first changed
+        self.tiles = { }
+
+    def __enter__(self) -> 'EventBatch':
+        self.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.depth -= 1
+        if self.depth == 0:
+            tiles = self.tiles
+            self.tiles = { }
+            for tile in tiles:
+                tile.notify_all(TileEvent(tile, EventKind.TileChanged))
+
+# ---------------------------------------------
+#   Candidate masks
+# ---------------------------------------------
+
+# Each symbol in CHOICES is one bit of a candidate mask,
+# so a set of candidates is a single int and set operations
+# on candidates are bit operations.
+BIT = {sym: 1 << i for i, sym in enumerate(CHOICES)}
+SYMBOL = {bit: sym for sym, bit in BIT.items()}
+ALL = (1 << len(CHOICES)) - 1
+# Number of candidates in each mask (int.bit_count needs Python 3.10)
+COUNT = [bin(mask).count("1") for mask in range(ALL + 1)]
+
+
+def to_mask(symbols: Iterable[str]) -> int:
+    """The mask with a bit for each symbol in symbols"""
+    mask = 0
+    for sym in symbols:
+        mask |= BIT[sym]
+    return mask
+
+
+def to_symbols(mask: int) -> Set[str]:
+    """The set of symbols whose bits are in mask"""
+    return {sym for sym, bit in BIT.items() if mask & bit}
+
+
 # ---------------------------------------------
 #   Tile class
 # ---------------------------------------------
@@ -114,6 +167,18 @@ class Tile(Listenable):
     value is a public read-only attribute; change it
     only through the acess method set_value of indirectly
     through method remove_candidates.
+    The candidates are kept in mask, an int with one bit per
+    symbol (see BIT); candidates is a view of mask as a set.
+    If trail is a list, each change first appends the prior
+    (tile, value, mask) to it, so that the change can be undone.
+    If dirty is a set, each change adds to it the numbers of the
+    groups the tile belongs to, so the board knows where to look.
+    If used is a list, used[group_i] is kept as the mask of values
+    placed in each group the tile belongs to, with placed[group_i]
+    counting the tiles holding each symbol (see Board.used).
+    A change notifies listeners with a TileEvent, unless there
+    are none (then no event is made) or events is an open
+    EventBatch (then the batch sends it later).
     """
 
     def __init__(self, row: int, col: int, value=UNKNOWN):
@@ -123,9 +188,20 @@ class Tile(Listenable):
         self.col = col
         self.value = value
         if self.value == UNKNOWN:
-            self.candidates = set(CHOICES)
+            self.mask = ALL
         else:
-            self.candidates = { value }
+            self.mask = BIT[value]
+        self.trail = None
+        self.dirty = None
+        self.events = None
+        self.used = None
+        self.placed = None
+        self.groups: List[int] = [ ]
+
+    @property
+    def candidates(self) -> Set[str]:
+        """The candidate values, as a fresh set of symbols"""
+        return to_symbols(self.mask)
 
     def __hash__(self) -> int:
         """Hash on position only (not value)"""
@@ -133,13 +209,48 @@ class Tile(Listenable):
     
     def set_value(self, value: str):
         """sets the value of the tile"""
+        self._changing()
         if value in CHOICES:
             self.value = value
-            self.candidates = {value}
+            self.mask = BIT[value]
         else:
             self.value = UNKNOWN
-            self.candidates = set(CHOICES)
-        self.notify_all(TileEvent(self, EventKind.TileChanged))
+            self.mask = ALL
+        self._changed()
+
+    def _changing(self):
+        """Called just before value or mask changes"""
+        if self.trail is not None:
+            self.trail.append((self, self.value, self.mask))
+        if self.dirty is not None:
+            self.dirty.update(self.groups)
+        if self.used is not None and self.value != UNKNOWN:
+            self._place(-1)
+
+    def _changed(self):
+        """Called just after value or mask changes"""
+        if self.used is not None and self.value != UNKNOWN:
+            self._place(1)
+        if not self.listeners:
+            return
+        if self.events is not None and self.events.depth:
+            self.events.tiles[self] = None
+        else:
+            self.notify_all(TileEvent(self, EventKind.TileChanged))
+
+    def _place(self, step: int):
+        """Count the value into (step 1) or out of (step -1) the
+        groups the tile belongs to
+        """
+        bit = BIT[self.value]
+        sym_i = bit.bit_length() - 1
+        for group_i in self.groups:
+            counts = self.placed[group_i]
+            counts[sym_i] += step
+            if counts[sym_i]:
+                self.used[group_i] |= bit
+            else:
+                self.used[group_i] &= ~bit
 
     def __str__(self) -> str:
         return self.value
@@ -149,26 +260,29 @@ class Tile(Listenable):
     
     def could_be(self, value: str) -> bool:
         """True if value is a candidate value for this tile"""
-        return value in self.candidates
+        return bool(self.mask & BIT.get(value, 0))
     
-    def remove_candidates(self, used_values: Set[str]) -> bool:
+    def remove_candidates(self, used_values: Union[Set[str], int]) -> bool:
         """The used values cannot be a value of this unknown tile.
         We removes those possibilities from the list of candidates.
         If there is exactly one candidate left, we set the
-        value of the tile.
+        value of the tile.  used_values may be a set of symbols
+        or a mask of them.
         Returns: True means we eliminated at least oone candidate,
         False mean nothing changed (none of the 'used_values' was
         in out candidates set).
         """
-        # difference returns the values from the first set thatt aren't in the second.
-        new_candidates = self.candidates.difference(used_values) # problem is im passing tile objects for used_values
-        if new_candidates == self.candidates:
+        if not isinstance(used_values, int):
+            used_values = to_mask(used_values)
+        new_mask = self.mask & ~used_values
+        if new_mask == self.mask:
             # Didn't remove any candidates
             return False
-        self.candidates = new_candidates
-        if len(self.candidates) == 1:
-            self.set_value(new_candidates.pop())
-        self.notify_all(TileEvent(self, EventKind.TileChanged))
+        self._changing()
+        self.mask = new_mask
+        if new_mask in SYMBOL:
+            self.value = SYMBOL[new_mask]
+        self._changed()
         return True
     
     
@@ -184,10 +298,27 @@ class Board(object):
         """The empty board"""
         # Row/Column structure: Each row contains columns
         self.tiles: List[List[Tile]] = [ ]
+        # Prior states of changed tiles, most recent last (see undo)
+        self.trail = [ ]
+        # Numbers of groups with a tile changed since we last
+        # applied the tactics to them (see propogate)
+        self.dirty = set()
+        # Coalesces tile events during bulk changes
+        self.events = EventBatch()
+        # Per group, the mask of values placed in it and the number
+        # of tiles holding each symbol; kept by the tiles as they change
+        self.used: List[int] = [ ]
+        self.placed: List[List[int]] = [ ]
         for row in range(NROWS):
             cols = [ ]
             for col in range(NCOLS):
-                cols.append(Tile(row, col))
+                tile = Tile(row, col)
+                tile.trail = self.trail
+                tile.dirty = self.dirty
+                tile.events = self.events
+                tile.used = self.used
+                tile.placed = self.placed
+                cols.append(tile)
             self.tiles.append(cols)
 
         # building groups
@@ -210,14 +341,28 @@ class Board(object):
                         col_addr = (ROOT * block_col) + col
                         group.append(self.tiles[row_addr][col_addr])
                 self.groups.append(group)
+        for group_i, group in enumerate(self.groups):
+            for tile in group:
+                tile.groups.append(group_i)
+        self.used.extend(0 for _ in self.groups)
+        self.placed.extend([0] * len(CHOICES) for _ in self.groups)
         
 
     def set_tiles(self, tile_values: Sequence[Sequence[str]]):
         """Set the tile values a list of lists or a list of string"""
-        for row_num in range(NROWS):
-            for col_num in range(NCOLS):
-                tile = self.tiles[row_num][col_num]
-                tile.set_value(tile_values[row_num][col_num])
+        # Every tile is replaced, so start the used masks afresh
+        for group_i, counts in enumerate(self.placed):
+            self.used[group_i] = 0
+            counts[:] = [0] * len(CHOICES)
+        with self.events:
+            for row_num in range(NROWS):
+                for col_num in range(NCOLS):
+                    tile = self.tiles[row_num][col_num]
+                    # Already counted out above
+                    tile.value = UNKNOWN
+                    tile.set_value(tile_values[row_num][col_num])
+        # A new puzzle; there is nothing to go back to
+        self.trail.clear()
 
     def __str__(self) -> str:
         """In Sadmn Sudoku format"""
@@ -235,14 +380,9 @@ class Board(object):
     
     def is_consistent(self) -> bool:
         """detects duplicate values in rows, columns, or blocks"""
-        for group in self.groups:
-            used_symbols = set()
-            for tile in group:
-                if tile.value in CHOICES:
-                    if tile.value in used_symbols:
-                        return False
-                    else:
-                        used_symbols.add(tile.value)
+        for counts in self.placed:
+            if max(counts) > 1:
+                return False
         return True
     
     def naked_single(self) -> bool:
@@ -250,41 +390,52 @@ class Board(object):
         Return value True means we crossed off at least one candidate.
         Return value False means we made no progress.
         """
-        t_or_f = []
-        for group in self.groups:
-            used_values = set()
-            for tile in group:
-                if tile.value in CHOICES:
-                    used_values.add(tile.value)
-            for tile in group:
-                if tile.value == UNKNOWN:
-                    t_or_f.append(tile.remove_candidates(used_values))
-        if True in t_or_f:
-            return True
-        return False
+        progress = False
+        for group_i in range(len(self.groups)):
+            if self.naked_single_group(group_i):
+                progress = True
+        return progress
+
+    def naked_single_group(self, group_i: int) -> bool:
+        """naked_single for just the group numbered group_i"""
+        progress = False
+        used = self.used[group_i]
+        for tile in self.groups[group_i]:
+            if tile.value == UNKNOWN:
+                if tile.remove_candidates(used):
+                    progress = True
+        return progress
 
     def hidden_single(self) -> bool:
         """if a candidate for a tile in group can't be anywhere
         else, the tile.value is set to that candidate"""
-        t_f = []
-        for group in self.groups:
-            leftovers = set(CHOICES)
+        progress = False
+        for group_i in range(len(self.groups)):
+            if self.hidden_single_group(group_i):
+                progress = True
+        return progress
+
+    def hidden_single_group(self, group_i: int) -> bool:
+        """hidden_single for just the group numbered group_i"""
+        progress = False
+        group = self.groups[group_i]
+        # Bits seen in at least one tile, and in at least two
+        once = twice = 0
+        for tile in group:
+            twice |= once & tile.mask
+            once |= tile.mask
+        singles = once & ~twice & ~self.used[group_i]
+        while singles:
+            bit = singles & -singles
+            singles ^= bit
             for tile in group:
-                if tile.value in CHOICES:
-                    leftovers.discard(tile.value)
-            for num in leftovers:
-                num_count = 0
-                tile_tracker = []
-                for tile in group:
-                    if num in tile.candidates:
-                        num_count += 1
-                        tile_tracker.append(tile)
-                if num_count == 1: 
-                    tile_tracker[0].set_value(num)
-                    t_f.append(True)
-        if True in t_f:
-            return True
-        return False
+                if tile.mask & bit:
+                    # Unless an earlier single already claimed it
+                    if tile.value == UNKNOWN:
+                        tile.set_value(SYMBOL[bit])
+                        progress = True
+                    break
+        return progress
     
     def min_choice_tile(self) -> Tile:
         """Returns a tile with value UNKNOWN and
@@ -298,19 +449,30 @@ class Board(object):
             for col_i in range(len(self.tiles[0])):
                 cur_tile = self.tiles[row_i][col_i]
                 if cur_tile.value == UNKNOWN:
-                    if len(cur_tile.candidates) < candidate_count:
-                        candidate_count = len(cur_tile.candidates)
+                    count = COUNT[cur_tile.mask]
+                    if count < candidate_count:
+                        candidate_count = count
                         lowest_count_tile = cur_tile
         if lowest_count_tile != None:
             return lowest_count_tile
 
     def propogate(self):
         """Repeat solution tactics until we
-        don't make any progrerss, whether"""
-        progress = True
-        while progress:
-            progress = self.naked_single()
-            self.hidden_single()
+        don't make any progrerss.  Only groups in the dirty
+        worklist are visited; every tile change puts the tile's
+        groups back on it, so we stop when no group has changed
+        since we last looked at it.
+        Each round takes the groups dirty at its start; listeners
+        hear about the tiles changed in a round when it ends.
+        """
+        dirty = self.dirty
+        while dirty:
+            this_round = sorted(dirty)
+            dirty.clear()
+            with self.events:
+                for group_i in this_round:
+                    self.naked_single_group(group_i)
+                    self.hidden_single_group(group_i)
         return
 
     def is_complete(self) -> bool:
@@ -323,26 +485,41 @@ class Board(object):
                     return False
         return True
 
+    def undo(self, mark: int):
+        """Roll back every tile change made since the trail
+        had length mark, most recent first.  Each restored tile
+        notifies its listeners once, and the used masks follow
+        it back.  No groups are marked dirty, since solve only
+        marks the trail after propogate.
+        """
+        trail = self.trail
+        with self.events:
+            while len(trail) > mark:
+                tile, value, mask = trail.pop()
+                if tile.value != UNKNOWN:
+                    tile._place(-1)
+                tile.value = value
+                tile.mask = mask
+                tile._changed()
+
     def solve(self):
         """General solver; guess-and-check
         combined with constaint propogation.
+        Each guess is undone through the trail, so a failed
+        guess costs only as much as the changes it caused.
         """
         self.propogate()
-        if self.is_complete():
-            return True
-        elif not self.is_consistent():
+        if not self.is_consistent():
             return False
+        elif self.is_complete():
+            return True
         else:
-            saved = self.as_list()
+            mark = len(self.trail)
             guess_tile = self.min_choice_tile()
             for candidate in guess_tile.candidates:
                 guess_tile.set_value(candidate)
                 if self.solve():
                     return True
                 else:
-                    self.set_tiles(saved)
+                    self.undo(mark)
             return False
-                
-    
-
-
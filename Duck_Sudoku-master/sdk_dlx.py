@@ -0,0 +1,215 @@
+"""
+An exact-cover solving engine for Sudoku boards, using
+Knuth's Algorithm X with Dancing Links.
+
+Filling a board is an exact cover problem: choose one
+(row, column, symbol) placement for each tile so that every
+constraint is satisfied exactly once.  The constraints are
+that each tile holds a symbol, and that each row, column, and
+block holds each symbol.  The placements and constraints form
+a sparse 0/1 matrix, kept as circular doubly linked lists so
+that covering a constraint and uncovering it again when we
+backtrack are both cheap.
+
+The engine reads and writes the same Board and Tile state as
+Board.solve, so displays and listeners work unchanged:
+    sdk_dlx.solve(board)
+"""
+
+from sdk_config import CHOICES, UNKNOWN, ROOT
+from sdk_config import NROWS, NCOLS, NBLOCKS
+import sdk_board
+from typing import Iterator, List, Sequence, Tuple
+
+import logging
+logging.basicConfig()
+log = logging.getLogger(__name__)
+log.setLevel(logging.INFO)
+
+
+class _Node:
+    """A 1 in the matrix, linked to its neighbors in the
+    same matrix row (left, right) and column (up, down).
+    """
+    __slots__ = ("left", "right", "up", "down", "column", "row")
+
+    def __init__(self, column: '_Column', row: int):
+        self.left = self.right = self.up = self.down = self
+        self.column = column
+        self.row = row
+
+
+class _Column(_Node):
+    """Header of a constraint column; size counts its 1s"""
+    __slots__ = ("size",)
+
+    def __init__(self):
+        super().__init__(self, -1)
+        self.size = 0
+
+
+class ExactCover:
+    """An exact cover problem over columns numbered 0..n_columns-1.
+    Add each candidate row as the list of columns it covers;
+    rows are numbered in the order they are added.
+    """
+
+    def __init__(self, n_columns: int):
+        self.root = _Column()
+        self.columns: List[_Column] = []
+        for _ in range(n_columns):
+            column = _Column()
+            column.right = self.root
+            column.left = self.root.left
+            self.root.left.right = column
+            self.root.left = column
+            self.columns.append(column)
+        self.n_rows = 0
+
+    def add_row(self, columns: Sequence[int]) -> int:
+        """Add a row with a 1 in each of the given columns"""
+        row = self.n_rows
+        self.n_rows += 1
+        first = None
+        for col in columns:
+            column = self.columns[col]
+            node = _Node(column, row)
+            node.down = column
+            node.up = column.up
+            column.up.down = node
+            column.up = node
+            column.size += 1
+            if first is None:
+                first = node
+            else:
+                node.right = first
+                node.left = first.left
+                first.left.right = node
+                first.left = node
+        return row
+
+    def solutions(self) -> Iterator[List[int]]:
+        """Each exact cover, as a list of row numbers.
+        The list is reused between solutions; copy it to keep it.
+        """
+        chosen = []
+        yield from self._search(chosen)
+
+    def _search(self, chosen: List[int]) -> Iterator[List[int]]:
+        root = self.root
+        if root.right is root:
+            yield chosen
+            return
+        # The most constrained column keeps the search narrow
+        column = root.right
+        best = column
+        while column is not root:
+            if column.size < best.size:
+                best = column
+                if best.size <= 1:
+                    break
+            column = column.right
+        if best.size == 0:
+            return
+        _cover(best)
+        node = best.down
+        while node is not best:
+            chosen.append(node.row)
+            other = node.right
+            while other is not node:
+                _cover(other.column)
+                other = other.right
+            yield from self._search(chosen)
+            other = node.left
+            while other is not node:
+                _uncover(other.column)
+                other = other.left
+            chosen.pop()
+            node = node.down
+        _uncover(best)
+
+
+def _cover(column: _Column):
+    """Take column out of the header list, along with every
+    row that has a 1 in it.
+    """
+    column.right.left = column.left
+    column.left.right = column.right
+    row = column.down
+    while row is not column:
+        node = row.right
+        while node is not row:
+            node.down.up = node.up
+            node.up.down = node.down
+            node.column.size -= 1
+            node = node.right
+        row = row.down
+
+
+def _uncover(column: _Column):
+    """Exactly undo _cover(column)"""
+    row = column.up
+    while row is not column:
+        node = row.left
+        while node is not row:
+            node.column.size += 1
+            node.down.up = node
+            node.up.down = node
+            node = node.left
+        row = row.up
+    column.right.left = column
+    column.left.right = column
+
+
+# ------------------------------
+# Sudoku as exact cover
+# ------------------------------
+
+N_SYMBOLS = len(CHOICES)
+N_TILES = NROWS * NCOLS
+
+
+def _constraints(row: int, col: int, sym: int) -> List[int]:
+    """Columns covered by placing symbol number sym at (row, col):
+    the tile, then the symbol in its row, column, and block.
+    """
+    block = (row // ROOT) * ROOT + col // ROOT
+    return [row * NCOLS + col,
+            N_TILES + row * N_SYMBOLS + sym,
+            N_TILES + NROWS * N_SYMBOLS + col * N_SYMBOLS + sym,
+            N_TILES + (NROWS + NCOLS) * N_SYMBOLS + block * N_SYMBOLS + sym]
+
+
+def encode(board: sdk_board.Board
+           ) -> Tuple[ExactCover, List[sdk_board.Tile], List[str]]:
+    """The exact cover problem for board, with the tile and
+    symbol placed by each row.  Only the current candidates of
+    each tile become rows, so known tiles contribute one.
+    """
+    problem = ExactCover(N_TILES + (NROWS + NCOLS + NBLOCKS) * N_SYMBOLS)
+    tiles, symbols = [], []
+    for row in board.tiles:
+        for tile in row:
+            for sym_i, sym in enumerate(CHOICES):
+                if tile.mask & sdk_board.BIT[sym]:
+                    problem.add_row(_constraints(tile.row, tile.col, sym_i))
+                    tiles.append(tile)
+                    symbols.append(sym)
+    return problem, tiles, symbols
+
+
+def solve(board: sdk_board.Board) -> bool:
+    """Fill in board with Algorithm X.  Returns True and sets the
+    value of every unknown tile if there is a solution consistent
+    with the tiles' current candidates; otherwise returns False
+    and leaves the board alone.
+    """
+    problem, tiles, symbols = encode(board)
+    for chosen in problem.solutions():
+        for row in chosen:
+            tile = tiles[row]
+            if tile.value == UNKNOWN:
+                tile.set_value(symbols[row])
+        return True
+    log.debug("No exact cover")
+    return False
@@ -7,8 +7,8 @@ Author: M Young, January 2018
 """
 
 import sdk_board
-from sdk_config import NROWS
-from typing import List, Union
+from sdk_config import NROWS, NCOLS
+from typing import Iterator, List, Union
 from io import IOBase
 
 import logging
@@ -52,4 +52,34 @@ def read(f: Union[IOBase, str],
     return board
 
 
-
+def iter_puzzles(f: Union[IOBase, str]) -> Iterator[List[str]]:
+    """Read any number of puzzles from a file, each as the list of
+    its row strings (as for Board.set_tiles).  A puzzle is either
+    one line of NROWS * NCOLS symbols or a block of NROWS rows, as
+    in a single puzzle file.  Blank lines and lines starting with
+    '#' are skipped.
+    """
+    if isinstance(f, str):
+        f = open(f, "r")
+    block = []
+    with f:
+        for row in f:
+            row = row.strip()
+            if not row or row.startswith("#"):
+                if block:
+                    raise InputError("Puzzle has too few rows: {}"
+                                     .format(block))
+                continue
+            if len(row) == NROWS * NCOLS and not block:
+                yield [row[i:i + NCOLS] for i in range(0, len(row), NCOLS)]
+            elif len(row) == NCOLS:
+                block.append(row)
+                if len(block) == NROWS:
+                    yield block
+                    block = []
+            else:
+                raise InputError("Puzzle row wrong length: {}"
+                                 .format(row))
+    if block:
+        raise InputError("Puzzle has too few rows: {}"
+                         .format(block))
@@ -1,8 +1,9 @@
 """Sudoku solver with optional displays"""
 
 import argparse
-import sdk_display
+import sys
 import sdk_reader
+import sdk_batch
 
 import logging
 logging.basicConfig()
@@ -15,22 +16,48 @@ def cli() -> object:
     parser = argparse.ArgumentParser(description="Sudoku solver")
     parser.add_argument("-d", "--display", help="Graphical display",
                         action="store_true")
-    parser.add_argument("file", type=argparse.FileType('r'))
+    parser.add_argument("-e", "--engine", help="Solving engine: constraint "
+                        "propagation with guessing, or exact cover (dancing links)",
+                        choices=sorted(sdk_batch.ENGINES), default="propagate")
+    parser.add_argument("-b", "--batch", help="Solve every puzzle in the given "
+                        "directories or multi-puzzle files",
+                        action="store_true")
+    parser.add_argument("-o", "--output", help="Batch results file (default stdout)",
+                        default=None)
+    parser.add_argument("-j", "--jobs", help="Batch worker processes "
+                        "(default one per CPU)", type=int, default=None)
+    parser.add_argument("file", nargs="+")
     args = parser.parse_args()
+    if args.display and args.batch:
+        parser.error("--display cannot be used with --batch")
+    if len(args.file) > 1 and not args.batch:
+        parser.error("only --batch takes more than one file")
+    if args.output is not None and not args.batch:
+        parser.error("--output is only used with --batch")
     return args
 
 
 def main():
     args = cli()
-    board = sdk_reader.read(args.file)
+    if args.batch:
+        if args.output is None:
+            sdk_batch.run(args.file, sys.stdout, args.engine, args.jobs)
+        else:
+            # Opened only now, so a mistaken command can't truncate it
+            with open(args.output, "w") as out:
+                sdk_batch.run(args.file, out, args.engine, args.jobs)
+        return
+    board = sdk_reader.read(args.file[0])
     if args.display:
+        # Only import the graphics when we need them
+        import sdk_display
         display = sdk_display.Board(board, 800, 800)
         # pause = input("Press enter to continue")
     if board.is_consistent():
         # Pause if there is a display
         if args.display:
             input("Press enter to solve")
-        board.solve()
+        sdk_batch.ENGINES[args.engine](board)
         assert board.is_consistent()
     else:
         print("Board has duplicates; rejected")
@@ -4,6 +4,9 @@ import unittest
 from sdk_board import *
 from sdk_config import *
 import sdk_reader
+import sdk_dlx
+import sdk_batch
+import io
 
 class TestTileBasic(unittest.TestCase):
 
@@ -25,6 +28,19 @@ class TestTileBasic(unittest.TestCase):
         self.assertEqual(repr(tile), "Tile(5, 7, '9')")
         self.assertEqual(str(tile), "9")
 
+    def test_candidate_mask(self):
+        """candidates is a view of the tile's bit mask"""
+        tile = Tile(0, 0, UNKNOWN)
+        self.assertEqual(tile.mask, ALL)
+        self.assertTrue(tile.remove_candidates({'1', '2'}))
+        self.assertFalse(tile.remove_candidates(BIT['1']))
+        self.assertEqual(tile.candidates, set(CHOICES) - {'1', '2'})
+        self.assertFalse(tile.could_be('2'))
+        self.assertTrue(tile.could_be('3'))
+        tile.remove_candidates(ALL & ~BIT['7'])
+        self.assertEqual(tile.value, '7')
+        self.assertEqual(tile.mask, BIT['7'])
+
 class TestBoardBuild(unittest.TestCase):
 
     def test_initial_board(self):
@@ -194,6 +210,23 @@ class TestHiddenSingle(unittest.TestCase):
                                     "419873652", "725691438", "836425791",
                                     "394182576", "168957243", "572346819"]))
 
+    def test_propogate_worklist(self):
+        """propogate revisits only the groups of tiles that changed"""
+        board = sdk_reader.read("data/hidden_single_example.sdk")
+        self.assertEqual(board.dirty, set(range(len(board.groups))))
+        board.propogate()
+        self.assertEqual(board.dirty, set())
+        self.assertEqual(board.as_list(),
+                        [".........", "...2.....",  ".........",
+                         "....6....", "....2....",  "....8....",
+                         ".........", ".........", ".....2..."])
+        tile = board.tiles[0][0]
+        self.assertEqual(len(tile.groups), 3)
+        tile.remove_candidates({'9'})
+        self.assertEqual(board.dirty, set(tile.groups))
+        board.propogate()
+        self.assertEqual(board.dirty, set())
+
     def test_choose_min_tile(self):
         board = Board()
         """
@@ -262,6 +295,55 @@ class TestHiddenSingle(unittest.TestCase):
         board.set_tiles(tiles_list)
         self.assertFalse(board.is_complete())
 
+    def test_undo(self):
+        """undo rolls back tile values and candidates to a mark"""
+        board = Board()
+        board.set_tiles(["......12.", "24..1....", "9.1..4...",
+                         "4....365.", "....9....", ".364....1",
+                         "...1..5.6", "....5..43", ".72......"])
+        self.assertEqual(board.trail, [])
+        board.naked_single()
+        mark = len(board.trail)
+        saved = board.as_list()
+        masks = [tile.mask for row in board.tiles for tile in row]
+        board.tiles[0][0].set_value('6')
+        board.propogate()
+        self.assertNotEqual(board.as_list(), saved)
+        board.undo(mark)
+        self.assertEqual(len(board.trail), mark)
+        self.assertEqual(board.as_list(), saved)
+        self.assertEqual([tile.mask for row in board.tiles for tile in row], masks)
+
+    def test_used_masks(self):
+        """used follows set_tiles, changes, and undo without rescanning"""
+        def scanned(board):
+            return [to_mask(tile.value for tile in group if tile.value != UNKNOWN)
+                    for group in board.groups]
+        board = Board()
+        board.set_tiles(["......12.", "24..1....", "9.1..4...",
+                         "4....365.", "....9....", ".364....1",
+                         "...1..5.6", "....5..43", ".72......"])
+        self.assertEqual(board.used, scanned(board))
+        mark = len(board.trail)
+        board.tiles[0][0].set_value('1')
+        self.assertFalse(board.is_consistent())
+        board.propogate()
+        self.assertEqual(board.used, scanned(board))
+        board.undo(mark)
+        self.assertEqual(board.used, scanned(board))
+        self.assertTrue(board.is_consistent())
+        board.set_tiles(["." * 9] * 9)
+        self.assertEqual(board.used, [0] * len(board.groups))
+
+    def test_solve_rejects_inconsistent(self):
+        """Propagation can fill the board with duplicates;
+        that is not a solution.  From data/hardest.sdk
+        """
+        board = sdk_reader.read("data/hardest.sdk")
+        self.assertTrue(board.solve())
+        self.assertTrue(board.is_complete())
+        self.assertTrue(board.is_consistent())
+
     # final test case
     def test_guess_check(self):
         """From data/evil.sdk"""
@@ -276,5 +358,153 @@ class TestHiddenSingle(unittest.TestCase):
         self.assertEqual(board.as_list(), solution)
 
 
+class CountingListener(TileListener):
+    """Counts the events each tile sends"""
+
+    def __init__(self):
+        self.counts = { }
+
+    def notify(self, event: TileEvent):
+        self.counts[event.tile] = self.counts.get(event.tile, 0) + 1
+
+
+class TestEvents(unittest.TestCase):
+    """Tile events are coalesced, and not made at all without listeners"""
+
+    def test_remove_candidates_notifies_once(self):
+        tile = Tile(0, 0)
+        listener = CountingListener()
+        tile.add_listener(listener)
+        tile.remove_candidates(ALL & ~BIT['5'])
+        self.assertEqual(tile.value, '5')
+        self.assertEqual(listener.counts[tile], 1)
+
+    def test_coalesced_per_round(self):
+        """Each tile sends at most one event per propagation round"""
+        class CountingBatch(EventBatch):
+            def __init__(self):
+                super().__init__()
+                self.closes = 0
+            def __exit__(self, *exc):
+                if self.depth == 1:
+                    self.closes += 1
+                super().__exit__(*exc)
+        board = Board()
+        batch = CountingBatch()
+        board.events = batch
+        seen = []
+        class RoundListener(TileListener):
+            def notify(self, event: TileEvent):
+                seen.append((event.tile, batch.closes))
+        for row in board.tiles:
+            for tile in row:
+                tile.events = batch
+                tile.add_listener(RoundListener())
+        board.set_tiles(["......12.", "24..1....", "9.1..4...",
+                         "4....365.", "....9....", ".364....1",
+                         "...1..5.6", "....5..43", ".72......"])
+        self.assertEqual(len(seen), NROWS * NCOLS)
+        board.propogate()
+        self.assertTrue(board.is_complete())
+        self.assertGreater(batch.closes, 2)
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_headless_makes_no_events(self):
+        board = Board()
+        made = []
+        class Spy(TileEvent):
+            def __init__(self, tile, kind):
+                made.append(tile)
+                super().__init__(tile, kind)
+        import sdk_board
+        saved = sdk_board.TileEvent
+        sdk_board.TileEvent = Spy
+        try:
+            board.set_tiles(["......12.", "24..1....", "9.1..4...",
+                             "4....365.", "....9....", ".364....1",
+                             "...1..5.6", "....5..43", ".72......"])
+            board.solve()
+        finally:
+            sdk_board.TileEvent = saved
+        self.assertTrue(board.is_complete())
+        self.assertEqual(made, [])
+
+
+class TestDancingLinks(unittest.TestCase):
+    """The exact cover engine should fill in the same boards"""
+
+    def test_exact_cover(self):
+        """Knuth's example from the Dancing Links paper"""
+        problem = sdk_dlx.ExactCover(7)
+        for columns in [[2, 4, 5], [0, 3, 6], [1, 2, 5],
+                        [0, 3], [1, 6], [3, 4, 6]]:
+            problem.add_row(columns)
+        solutions = [sorted(chosen) for chosen in problem.solutions()]
+        self.assertEqual(solutions, [[0, 3, 4]])
+
+    def test_dlx_guess_check(self):
+        """From data/evil.sdk, as in test_guess_check"""
+        board = Board()
+        board.set_tiles(["....5..1.", "2........", "5.19..48.",
+                         "6...1.24.", "8.......7", ".23.4...1",
+                         ".69..28.3", "........4", ".4..8...."])
+        self.assertTrue(sdk_dlx.solve(board))
+        self.assertEqual(board.as_list(),
+                         ["497856312", "286134795", "531927486",
+                          "675319248", "814265937", "923748561",
+                          "169472853", "758693124", "342581679"])
+
+    def test_dlx_hardest(self):
+        board = sdk_reader.read("data/hardest.sdk")
+        self.assertTrue(sdk_dlx.solve(board))
+        self.assertTrue(board.is_complete())
+        self.assertTrue(board.is_consistent())
+
+    def test_dlx_no_solution(self):
+        """A board with duplicates has no exact cover and is left alone"""
+        board = sdk_reader.read("data/bad.sdk")
+        before = board.as_list()
+        self.assertFalse(sdk_dlx.solve(board))
+        self.assertEqual(board.as_list(), before)
+
+
+class TestBatch(unittest.TestCase):
+    """Reading and solving many puzzles at once"""
+
+    EVIL = ["....5..1.", "2........", "5.19..48.",
+            "6...1.24.", "8.......7", ".23.4...1",
+            ".69..28.3", "........4", ".4..8...."]
+    SOLUTION = ("497856312286134795531927486675319248814265937"
+                "923748561169472853758693124342581679")
+
+    def test_iter_puzzles(self):
+        """One puzzle per line or per block of rows"""
+        text = "# A pack\n" + "".join(self.EVIL) + "\n\n" + "\n".join(self.EVIL) + "\n"
+        puzzles = list(sdk_reader.iter_puzzles(io.StringIO(text)))
+        self.assertEqual(puzzles, [self.EVIL, self.EVIL])
+        with self.assertRaises(sdk_reader.InputError):
+            list(sdk_reader.iter_puzzles(io.StringIO("\n".join(self.EVIL[:4]))))
+
+    def test_solve_all(self):
+        bad = ["11......."] + self.EVIL[1:]
+        puzzles = [("evil", self.EVIL), ("bad", bad), ("again", self.EVIL)]
+        for engine in sdk_batch.ENGINES:
+            for jobs in (1, 2):
+                results = list(sdk_batch.solve_all(puzzles, engine, jobs))
+                self.assertEqual([(name, status, solution)
+                                  for name, status, solution, seconds in results],
+                                 [("evil", "solved", self.SOLUTION),
+                                  ("bad", "rejected", "".join(bad)),
+                                  ("again", "solved", self.SOLUTION)])
+
+    def test_run(self):
+        out = io.StringIO()
+        counts = sdk_batch.run(["data/evil.sdk"], out, jobs=1)
+        self.assertEqual(counts, {"solved": 1, "unsolved": 0, "rejected": 0})
+        name, status, solution, seconds = out.getvalue().split()
+        self.assertEqual((name, status, solution),
+                         ("data/evil.sdk:1", "solved", self.SOLUTION))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file